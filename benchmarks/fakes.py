@@ -0,0 +1,528 @@
+"""
+Local stand-ins for every upstream the bot talks to.
+
+FakeUpstreams serves the SolanaTracker data and swap APIs, Solana JSON-RPC
+(HTTP and the signatureSubscribe websocket) and Supabase/PostgREST from one
+aiohttp server, each under its own path prefix. FakeTelegramRequest replaces the bot's HTTP transport and records
+outbound Bot API calls instead of sending them.
+
+Every upstream has its own latency (with jitter) and error rate. Single
+mints can be made slower on top of that through FakeUpstreams.mint_delays.
+"""
+import asyncio
+import base64
+import itertools
+import json
+import random
+import time
+from collections import Counter
+
+from aiohttp import WSMsgType, web
+from solders.hash import Hash
+from solders.keypair import Keypair
+from solders.message import Message
+from solders.pubkey import Pubkey
+from solders.system_program import TransferParams, transfer
+from solders.transaction import Transaction
+from telegram.request import BaseRequest
+
+SOL_MINT_ADDRESS = "So11111111111111111111111111111111111111112"
+TOKEN_PROGRAM_ID = "TokenkegQfeZyiNwAJbNbGKPFXCWuBvf9Ss623VQ5DA"
+UPSTREAMS = ("data", "swap", "rpc", "supabase", "telegram")
+SLOT_TIME = 0.4
+BLOCKHASH_VALIDITY = 150  # Blocks a fake blockhash stays valid for
+
+
+class UpstreamProfile:
+    """
+    Latency (ms), jitter (fraction of latency) and error rate of one upstream.
+    """
+
+    def __init__(self, latency_ms=0.0, jitter=0.2, error_rate=0.0):
+        self.latency_ms = latency_ms
+        self.jitter = jitter
+        self.error_rate = error_rate
+
+    async def delay(self):
+        if self.latency_ms > 0:
+            spread = self.latency_ms * self.jitter
+            await asyncio.sleep(max(0.0, random.uniform(self.latency_ms - spread, self.latency_ms + spread)) / 1000)
+
+    def should_fail(self):
+        return random.random() < self.error_rate
+
+
+def build_profiles(latency=None, errors=None, jitter=0.2):
+    """
+    Builds a profile per upstream from {name: latency_ms} and {name: error_rate}.
+    """
+    latency = latency or {}
+    errors = errors or {}
+    return {
+        name: UpstreamProfile(latency.get(name, 0.0), jitter, errors.get(name, 0.0))
+        for name in UPSTREAMS
+    }
+
+
+def default_config(user_id):
+    return {
+        "user_id": user_id,
+        "buy_left": 1.0,
+        "buy_right": 5.0,
+        "sell_left": 0.25,
+        "sell_right": 1.0,
+        "sell_initial": True,
+        "slippage_buy": 0.1,
+        "slippage_sell": 1.0,
+        "max_price_impact": 0.25,
+        "mev_protect": True,
+        "transaction_priority": "medium",
+        "tp_medium": 0.001,
+        "tp_high": 0.005,
+        "tp_very_high": 0.01,
+    }
+
+
+class FakeUpstreams:
+    """
+    One aiohttp server standing in for every HTTP upstream.
+
+    Signatures sent to the fake RPC report as confirmed once land_delay_ms has
+    passed since they were first sent, and the block height advances with the
+    wall clock so blockhash expiry behaves like mainnet. signatureSubscribe on
+    the websocket pushes a notification at the same moment.
+    """
+
+    def __init__(self, profiles=None, land_delay_ms=800, sol_balance=100.0, host="127.0.0.1", port=0):
+        self.profiles = profiles or build_profiles()
+        self.land_delay_ms = land_delay_ms
+        self.sol_balance = sol_balance
+        self.host = host
+        self.port = port
+        self.calls = Counter()
+        self.errors = Counter()
+        self.rpc_calls = Counter()  # JSON-RPC method -> calls, over HTTP and the websocket
+        self.tables = {"Wallets": {}, "User-Config": {}}
+        self.sent = {}  # signature -> monotonic time first seen
+        self.mint_delays = {}  # mint -> extra ms its token info takes
+        self.websocket_enabled = True  # False refuses websocket connections
+        self.websockets = set()
+        self.ws_subscriptions = {}  # subscription id -> (method, params), across connections
+        self._subscription_ids = itertools.count(1)
+        self._started_at = time.monotonic()
+        self._blockhash = str(Hash.new_unique())
+        self._blockhash_height = 0
+        self._runner = None
+
+        self.app = web.Application(middlewares=[self._inject])
+        self.app.router.add_get("/data/tokens/{mint}", self.token_info)
+        self.app.router.add_get("/data/wallet/{address}", self.wallet_tokens)
+        self.app.router.add_get("/swap/swap", self.swap)
+        self.app.router.add_post("/rpc", self.rpc)
+        self.app.router.add_get("/rpc/ws", self.rpc_websocket)
+        self.app.router.add_route("*", "/supabase/rest/v1/{table}", self.postgrest)
+
+    @property
+    def base_url(self):
+        return f"http://{self.host}:{self.port}"
+
+    @property
+    def ws_url(self):
+        return f"ws://{self.host}:{self.port}/rpc/ws"
+
+    def env(self):
+        """
+        Environment variables that point the bot's services at this server.
+        """
+        rpc_url = f"{self.base_url}/rpc"
+        return {
+            "SOL_TRACKER_DATA_URL": f"{self.base_url}/data",
+            "SOL_TRACKER_SWAP_URL": f"{self.base_url}/swap",
+            "SOLANA_RPC_URLS": rpc_url,
+            "SEND_RPC_URLS": rpc_url,
+            "CONFIRMATION_WS_URL": self.ws_url,
+            "WALLET_WATCH_WS_URL": self.ws_url,
+            "SUPABASE_URL": f"{self.base_url}/supabase",
+            "SUPABASE_KEY": "bench.fake.key",
+            "SOL_TRACKER_KEY": "bench-fake-key",
+        }
+
+    async def start(self):
+        self._runner = web.AppRunner(self.app, access_log=None)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, self.host, self.port)
+        await site.start()
+        self.port = self._runner.addresses[0][1]
+
+    async def stop(self):
+        if self._runner is not None:
+            await self._runner.cleanup()
+            self._runner = None
+
+    def seed_users(self, user_ids):
+        """
+        Gives each user a funded wallet and a default User-Config row.
+        """
+        for user_id in user_ids:
+            keypair = Keypair()
+            self.tables["Wallets"][str(user_id)] = {
+                "user_id": user_id,
+                "public_key": str(keypair.pubkey()),
+                "private_key": base64.b64encode(bytes(keypair.secret())).decode(),
+            }
+            self.tables["User-Config"][str(user_id)] = default_config(user_id)
+
+    @web.middleware
+    async def _inject(self, request, handler):
+        upstream = request.path.split("/")[1]
+        profile = self.profiles[upstream]
+        self.calls[upstream] += 1
+        await profile.delay()
+        if profile.should_fail():
+            self.errors[upstream] += 1
+            return web.json_response({"error": f"injected {upstream} failure"}, status=500)
+        return await handler(request)
+
+    # SolanaTracker data API
+
+    async def token_info(self, request):
+        mint = request.match_info["mint"]
+        if mint in self.mint_delays:
+            await asyncio.sleep(self.mint_delays[mint] / 1000)
+        price = random.uniform(0.00001, 2)
+        return web.json_response({
+            "token": {
+                "name": f"Bench {mint[:4]}",
+                "symbol": mint[:4].upper(),
+                "mint": mint,
+                "description": "Benchmark token",
+                "image": "",
+            },
+            "pools": [{"price": {"usd": price}, "marketCap": {"usd": price * 1_000_000_000}}],
+            "events": {
+                window: {"priceChangePercentage": random.uniform(-50, 50)}
+                for window in ("5m", "1h", "6h", "24h")
+            },
+        })
+
+    async def wallet_tokens(self, request):
+        return web.json_response({
+            "tokens": [
+                {
+                    "token": {"name": f"Bench {i}", "symbol": f"B{i}", "image": "", "mint": str(Pubkey.new_unique())},
+                    "balance": random.uniform(1, 1_000_000),
+                    "value": random.uniform(1, 1000),
+                }
+                for i in range(5)
+            ],
+        })
+
+    # SolanaTracker swap API
+
+    async def swap(self, request):
+        payer = Pubkey.from_string(request.query["payer"])
+        from_amount = request.query["fromAmount"]
+        is_sell = from_amount.endswith("%")
+
+        # A 0 lamport self-transfer stands in for the swap, it only has to be signable by the payer
+        message = Message.new_with_blockhash(
+            [transfer(TransferParams(from_pubkey=payer, to_pubkey=payer, lamports=0))], payer, Hash.default(),
+        )
+        txn = Transaction.new_unsigned(message)
+        amount_in = float(from_amount.rstrip("%")) if not is_sell else random.uniform(1, 1_000_000)
+        return web.json_response({
+            "txn": base64.b64encode(bytes(txn)).decode(),
+            "type": "legacy",
+            "rate": {
+                "amountIn": amount_in,
+                "amountOut": random.uniform(1, 1_000_000),
+                "minAmountOut": 0,
+                "priceImpact": 0.001,
+                "platformFee": 1_000_000,
+                "baseCurrency": {"mint": request.query["from"], "decimals": 9},
+                "quoteCurrency": {"mint": request.query["to"], "decimals": 6},
+            },
+        })
+
+    # Solana JSON-RPC
+
+    def land(self, signature):
+        """
+        Makes signature count as sent long enough ago to have landed.
+        """
+        self.sent[str(signature)] = time.monotonic() - self.land_delay_ms / 1000
+
+    def _landed(self, signature):
+        sent_at = self.sent.get(signature)
+        return sent_at is not None and (time.monotonic() - sent_at) * 1000 >= self.land_delay_ms
+
+    def _block_height(self):
+        return int((time.monotonic() - self._started_at) / SLOT_TIME) + 1_000_000
+
+    def _rpc_result(self, method, params):
+        height = self._block_height()
+        context = {"slot": height + 20}
+        if method == "getSlot":
+            return context["slot"]
+        if method == "getBlockHeight":
+            return height
+        if method == "getLatestBlockhash":
+            if height - self._blockhash_height > 10:
+                self._blockhash = str(Hash.new_unique())
+                self._blockhash_height = height
+            return {"context": context, "value": {
+                "blockhash": self._blockhash,
+                "lastValidBlockHeight": self._blockhash_height + BLOCKHASH_VALIDITY,
+            }}
+        if method == "getBalance":
+            return {"context": context, "value": int(self.sol_balance * 1e9)}
+        if method == "getTokenAccountsByOwner":
+            return {"context": context, "value": [{
+                "pubkey": str(Pubkey.new_unique()),
+                "account": {
+                    "lamports": 2_039_280,
+                    "owner": TOKEN_PROGRAM_ID,
+                    "data": [base64.b64encode(bytes(165)).decode(), "base64"],
+                    "executable": False,
+                    "rentEpoch": 0,
+                    "space": 165,
+                },
+            }]}
+        if method == "sendTransaction":
+            txn = Transaction.from_bytes(base64.b64decode(params[0]))
+            signature = str(txn.signatures[0])
+            self.sent.setdefault(signature, time.monotonic())
+            return signature
+        if method == "getSignatureStatuses":
+            statuses = []
+            for signature in params[0]:
+                if not self._landed(signature):
+                    statuses.append(None)
+                else:
+                    statuses.append({
+                        "slot": context["slot"],
+                        "confirmations": 1,
+                        "err": None,
+                        "status": {"Ok": None},
+                        "confirmationStatus": "confirmed",
+                    })
+            return {"context": context, "value": statuses}
+        raise KeyError(method)
+
+    async def rpc(self, request):
+        body = await request.json()
+
+        def respond(call):
+            self.rpc_calls[call["method"]] += 1
+            try:
+                return {"jsonrpc": "2.0", "id": call["id"], "result": self._rpc_result(call["method"], call.get("params", []))}
+            except KeyError:
+                return {"jsonrpc": "2.0", "id": call["id"], "error": {"code": -32601, "message": "Method not found"}}
+
+        if isinstance(body, list):
+            return web.json_response([respond(call) for call in body])
+        return web.json_response(respond(body))
+
+    # Solana JSON-RPC websocket
+
+    async def rpc_websocket(self, request):
+        if not self.websocket_enabled:
+            return web.json_response({"error": "websocket disabled"}, status=503)
+        ws = web.WebSocketResponse()
+        await ws.prepare(request)
+        self.websockets.add(ws)
+        subscription_ids = set()  # every subscription opened on this connection
+        notifiers = {}  # signature subscription id -> task pushing its notification
+        try:
+            async for msg in ws:
+                if msg.type != WSMsgType.TEXT:
+                    continue
+                call = json.loads(msg.data)
+                method, params = call["method"], call.get("params", [])
+                self.rpc_calls[method] += 1
+                response = {"jsonrpc": "2.0", "id": call["id"]}
+                if method.endswith("Unsubscribe"):
+                    response["result"] = self.ws_subscriptions.pop(params[0], None) is not None
+                    subscription_ids.discard(params[0])
+                    notifier = notifiers.pop(params[0], None)
+                    if notifier is not None:
+                        notifier.cancel()
+                elif method.endswith("Subscribe"):
+                    response["result"] = next(self._subscription_ids)
+                    self.ws_subscriptions[response["result"]] = (method, params)
+                    subscription_ids.add(response["result"])
+                else:
+                    response["error"] = {"code": -32601, "message": "Method not found"}
+                await ws.send_json(response)
+
+                # Started after the reply so the client knows the subscription id first
+                if method == "signatureSubscribe":
+                    notifiers[response["result"]] = asyncio.ensure_future(
+                        self._notify_landed(ws, response["result"], params[0], notifiers)
+                    )
+        finally:
+            self.websockets.discard(ws)
+            for notifier in notifiers.values():
+                notifier.cancel()
+            for subscription_id in subscription_ids:
+                self.ws_subscriptions.pop(subscription_id, None)
+        return ws
+
+    async def _notify_landed(self, ws, subscription_id, signature, notifiers):
+        while not self._landed(signature):
+            await asyncio.sleep(0.02)
+        # signatureSubscribe is one-shot, the subscription ends with its notification
+        notifiers.pop(subscription_id, None)
+        self.ws_subscriptions.pop(subscription_id, None)
+        await ws.send_json({
+            "jsonrpc": "2.0",
+            "method": "signatureNotification",
+            "params": {
+                "result": {"context": {"slot": self._block_height() + 20}, "value": {"err": None}},
+                "subscription": subscription_id,
+            },
+        })
+
+    async def drop_websockets(self):
+        """
+        Closes every open websocket from the server side, like a restarting RPC node.
+        """
+        for ws in list(self.websockets):
+            await ws.close()
+
+    # Supabase / PostgREST
+
+    @staticmethod
+    def _filters(request):
+        # Only the filters the bot uses, e.g. user_id=eq.123 and key=in.("user:1","user:2")
+        filters = {}
+        for column, value in request.query.items():
+            if value.startswith("eq."):
+                filters[column] = {value[len("eq."):]}
+            elif value.startswith("in.("):
+                filters[column] = {item.strip('"') for item in value[len("in.("):-1].split(",")}
+        return filters
+
+    @staticmethod
+    def _select(row, columns):
+        if columns in (None, "*"):
+            return dict(row)
+        return {column.strip(): row.get(column.strip()) for column in columns.split(",")}
+
+    async def postgrest(self, request):
+        table = self.tables.setdefault(request.match_info["table"], {})
+        filters = self._filters(request)
+        matches = [
+            row for row in table.values()
+            if all(str(row.get(column)) in values for column, values in filters.items())
+        ]
+
+        if request.method == "GET":
+            return web.json_response([self._select(row, request.query.get("select")) for row in matches])
+
+        if request.method == "PATCH":
+            updates = await request.json()
+            for row in matches:
+                row.update(updates)
+            return web.json_response(matches)
+
+        if request.method == "DELETE":
+            for key in [key for key, row in table.items() if row in matches]:
+                del table[key]
+            return web.json_response(matches)
+
+        if request.method == "POST":
+            body = await request.json()
+            rows = body if isinstance(body, list) else [body]
+            ignore_duplicates = "ignore-duplicates" in request.headers.get("Prefer", "")
+            conflict_column = request.query.get("on_conflict", "user_id")
+            written = []
+            for row in rows:
+                key = str(row[conflict_column])
+                if key in table and ignore_duplicates:
+                    continue
+                table.setdefault(key, {}).update(row)
+                written.append(dict(table[key]))
+            return web.json_response(written, status=201)
+
+        return web.json_response({"message": "Method not allowed"}, status=405)
+
+
+class FakeTelegramRequest(BaseRequest):
+    """
+    Bot API transport that answers every call locally and records it.
+
+    Calls are counted per Bot API method in calls; replies starting with ❌
+    are counted in error_replies so handler-level failures show up in reports.
+    """
+
+    def __init__(self, profile=None):
+        self.profile = profile or UpstreamProfile()
+        self.calls = Counter()
+        self.error_replies = 0
+        self.log = []  # (monotonic time, method, parameters) of every call
+        self._message_ids = itertools.count(1)
+        self._file_ids = itertools.count(1)
+
+    @property
+    def read_timeout(self):
+        return None
+
+    async def initialize(self):
+        pass
+
+    async def shutdown(self):
+        pass
+
+    def _message(self, parameters):
+        chat_id = parameters.get("chat_id") or 0
+        message = {
+            "message_id": int(parameters.get("message_id") or next(self._message_ids)),
+            "date": int(time.time()),
+            "chat": {"id": int(chat_id) if str(chat_id).lstrip("-").isdigit() else 0, "type": "private"},
+        }
+        if parameters.get("text"):
+            message["text"] = parameters["text"]
+        if parameters.get("caption"):
+            message["caption"] = parameters["caption"]
+        return message
+
+    def _photo_message(self, parameters):
+        # A file_id this fake handed out is sent back as is, anything else counts as an upload
+        photo = parameters.get("photo")
+        file_id = photo if isinstance(photo, str) and photo.startswith("fake-file-") else f"fake-file-{next(self._file_ids)}"
+        message = self._message(parameters)
+        message["photo"] = [{"file_id": file_id, "file_unique_id": file_id, "width": 600, "height": 200}]
+        return message
+
+    def _result(self, method, parameters):
+        if method == "getMe":
+            return {"id": 1, "is_bot": True, "first_name": "Bench", "username": "bench_bot"}
+        if method == "sendPhoto":
+            return self._photo_message(parameters)
+        if method in ("sendMessage", "editMessageText", "editMessageCaption", "editMessageReplyMarkup"):
+            return self._message(parameters)
+        return True
+
+    async def do_request(
+        self,
+        url,
+        method,
+        request_data=None,
+        read_timeout=None,
+        write_timeout=None,
+        connect_timeout=None,
+        pool_timeout=None,
+    ):
+        api_method = url.rsplit("/", 1)[-1]
+        parameters = request_data.parameters if request_data is not None else {}
+        self.calls[api_method] += 1
+        self.log.append((time.monotonic(), api_method, parameters))
+        text = parameters.get("text") or parameters.get("caption") or ""
+        if isinstance(text, str) and text.startswith("❌"):
+            self.error_replies += 1
+
+        await self.profile.delay()
+        if self.profile.should_fail():
+            return 500, json.dumps({"ok": False, "error_code": 500, "description": "Injected failure"}).encode()
+        return 200, json.dumps({"ok": True, "result": self._result(api_method, parameters)}).encode()
@@ -0,0 +1,231 @@
+"""
+Concurrent-user load test of the Application built in main.py.
+
+Synthetic users paste a mint, press buy_left and confirm, buy a custom amount
+through a ForceReply reply, cancel, then change a setting through another
+ForceReply reply. Their updates go through application.update_queue exactly as
+polled updates would. Bot API calls are answered and recorded by a fake
+transport, and every other upstream is served by benchmarks/fakes.py.
+
+For each concurrency level it reports updates/sec, per-update and per-user
+session latency, and event loop lag.
+
+    python -m benchmarks.load --users 1,10,100,1000,5000 --latency rpc=30,swap=120,supabase=15
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import time
+from collections import Counter
+
+from telegram import Update
+from telegram.ext import TypeHandler
+
+from benchmarks.fakes import FakeTelegramRequest, FakeUpstreams, build_profiles
+from benchmarks.offline import parse_pairs, percentile
+from benchmarks.updates import UpdateFactory, random_mint
+
+COMPLETION_GROUP = 1000  # Runs after every real handler group
+LAG_INTERVAL = 0.01
+
+
+def session(mint):
+    """
+    The updates one user sends, in order: (kind, text or callback data, replied-to prompt).
+    """
+    return [
+        ("message", mint, None),
+        ("callback", f"buy_left:{mint}", None),
+        ("callback", "confirm", None),
+        ("callback", f"buy_custom:{mint}", None),
+        ("message", "0.5", "Please enter the amount in SOL:"),
+        ("callback", "cancel", None),
+        ("callback", "main_settings", None),
+        ("callback", "settings_set_buy_left", None),
+        ("message", "2", "Enter the new **Buy Left** value (in SOL):"),
+    ]
+
+
+class LoadRunner:
+    """
+    Feeds updates into the Application and times each one until its last handler group finishes.
+    """
+
+    def __init__(self, application, update_timeout):
+        self.application = application
+        self.updates = UpdateFactory(application.bot)
+        self.update_timeout = update_timeout
+        self.errors = 0
+        self.timeouts = 0
+        self._pending = {}  # update_id -> future resolved when the update is done
+
+        application.add_handler(TypeHandler(Update, self._done), group=COMPLETION_GROUP)
+        application.add_error_handler(self._error)
+
+    async def _done(self, update, context):
+        future = self._pending.pop(update.update_id, None)
+        if future is not None and not future.done():
+            future.set_result(None)
+
+    async def _error(self, update, context):
+        self.errors += 1
+
+    async def send(self, update):
+        """
+        Queues update and returns how long it took to process, in milliseconds.
+        """
+        future = asyncio.get_running_loop().create_future()
+        self._pending[update.update_id] = future
+        started = time.perf_counter()
+        await self.application.update_queue.put(update)
+        try:
+            await asyncio.wait_for(future, self.update_timeout)
+        except asyncio.TimeoutError:
+            self.timeouts += 1
+            self._pending.pop(update.update_id, None)
+        return (time.perf_counter() - started) * 1000
+
+    async def run_session(self, user_id, mint, ramp, think_time, update_samples):
+        await asyncio.sleep(random.uniform(0, ramp))
+        started = time.perf_counter()
+        for kind, text, reply_to in session(mint):
+            if kind == "callback":
+                update = self.updates.callback(user_id, text)
+            else:
+                update = self.updates.message(user_id, text, reply_to)
+            update_samples.append(await self.send(update))
+            if think_time:
+                await asyncio.sleep(think_time)
+        return (time.perf_counter() - started) * 1000
+
+
+async def sample_loop_lag(samples):
+    while True:
+        started = time.perf_counter()
+        await asyncio.sleep(LAG_INTERVAL)
+        samples.append((time.perf_counter() - started - LAG_INTERVAL) * 1000)
+
+
+def stats(samples):
+    return {
+        "p50_ms": round(percentile(samples, 50), 1),
+        "p99_ms": round(percentile(samples, 99), 1),
+        "max_ms": round(max(samples, default=0.0), 1),
+    }
+
+
+async def run_level(runner, telegram_request, user_ids, mints, args):
+    errors, timeouts = runner.errors, runner.timeouts
+    telegram_calls = Counter(telegram_request.calls)
+    update_samples, lag_samples = [], []
+
+    lag_task = asyncio.create_task(sample_loop_lag(lag_samples))
+    started = time.perf_counter()
+    try:
+        session_samples = await asyncio.gather(*(
+            runner.run_session(user_id, random.choice(mints), args.ramp, args.think_time, update_samples)
+            for user_id in user_ids
+        ))
+    finally:
+        elapsed = time.perf_counter() - started
+        lag_task.cancel()
+
+    return {
+        "users": len(user_ids),
+        "updates": len(update_samples),
+        "elapsed_s": round(elapsed, 2),
+        "updates_per_sec": round(len(update_samples) / elapsed, 1),
+        "update_latency": stats(update_samples),
+        "session_latency": stats(session_samples),
+        "loop_lag": stats(lag_samples),
+        "errors": runner.errors - errors,
+        "timeouts": runner.timeouts - timeouts,
+        "telegram_calls": sum((telegram_request.calls - telegram_calls).values()),
+    }
+
+
+def print_level(level):
+    print(
+        f"{level['users']:>7}{level['updates']:>9}{level['updates_per_sec']:>10}"
+        f"{level['update_latency']['p50_ms']:>10}{level['update_latency']['p99_ms']:>10}"
+        f"{level['session_latency']['p50_ms']:>11}{level['session_latency']['p99_ms']:>11}"
+        f"{level['loop_lag']['p99_ms']:>10}{level['loop_lag']['max_ms']:>10}"
+        f"{level['errors']:>8}{level['timeouts']:>9}"
+    )
+
+
+async def run(args):
+    levels = [int(users) for users in args.users.split(",")]
+    fakes = FakeUpstreams(
+        build_profiles(parse_pairs(args.latency), parse_pairs(args.errors), args.jitter),
+        land_delay_ms=args.land_delay,
+    )
+    await fakes.start()
+
+    # Services read their configuration at import time, so point them at the fakes before importing main
+    os.environ.update(fakes.env())
+    os.environ.update({"PUBSUB_BACKEND": "memory", "SWAP_CONFIRMATION_MODE": "polling", "WALLET_WATCH": "false", "FILE_ID_CACHE_PATH": "", "METRICS_PORT": ""})
+
+    from main import build_application, post_init, post_shutdown
+
+    telegram_request = FakeTelegramRequest(fakes.profiles["telegram"])
+    application = build_application("1:bench", telegram_request, FakeTelegramRequest())
+    runner = LoadRunner(application, args.update_timeout)
+
+    # Every level gets its own users so caches start cold
+    fakes.seed_users(range(1, sum(levels) + 1))
+    mints = [random_mint() for _ in range(args.mints)]
+
+    await application.initialize()
+    await post_init(application)
+    await application.start()
+
+    print(
+        f"{'users':>7}{'updates':>9}{'upd/s':>10}{'upd p50':>10}{'upd p99':>10}"
+        f"{'sess p50':>11}{'sess p99':>11}{'lag p99':>10}{'lag max':>10}{'errors':>8}{'timeouts':>9}"
+    )
+    results = []
+    first_user = 1
+    try:
+        for users in levels:
+            user_ids = range(first_user, first_user + users)
+            first_user += users
+            level = await run_level(runner, telegram_request, user_ids, mints, args)
+            results.append(level)
+            print_level(level)
+    finally:
+        await application.stop()
+        await post_shutdown(application)
+        await application.shutdown()
+        await fakes.stop()
+
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--users", default="1,10,100,1000,5000", help="comma separated concurrency levels")
+    parser.add_argument("--mints", type=int, default=200, help="distinct mints users paste")
+    parser.add_argument("--ramp", type=float, default=1.0, help="seconds over which each level's users start")
+    parser.add_argument("--think-time", type=float, default=0.0, help="seconds a user waits between updates")
+    parser.add_argument("--update-timeout", type=float, default=120, help="seconds before an update counts as timed out")
+    parser.add_argument("--latency", default="", help="per-upstream latency in ms, e.g. rpc=30,swap=120")
+    parser.add_argument("--errors", default="", help="per-upstream error rate, e.g. swap=0.02")
+    parser.add_argument("--jitter", type=float, default=0.2, help="latency jitter as a fraction of latency")
+    parser.add_argument("--land-delay", type=float, default=800, help="ms before a sent transaction confirms")
+    parser.add_argument("--json", help="write results to this file")
+    parser.add_argument("--seed", type=int, default=None, help="random seed")
+    args = parser.parse_args()
+
+    random.seed(args.seed)
+    results = asyncio.run(run(args))
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
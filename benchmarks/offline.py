@@ -0,0 +1,208 @@
+"""
+Offline end-to-end benchmark of the bot's main flows.
+
+Runs the real handlers (start, handle_coin_info, handle_buy_sell,
+handle_confirmation, trades) for a number of concurrent users against the
+local fakes in benchmarks/fakes.py, then reports latency percentiles and
+throughput per flow. Nothing leaves the machine.
+
+    python -m benchmarks.offline --users 50 --rounds 5 --latency rpc=30,swap=120,supabase=15 --errors swap=0.02
+
+Save a run with --json and pass it back as --baseline to fail (exit code 1)
+when a flow's p90 regresses by more than --tolerance.
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import sys
+import time
+
+from telegram.ext import CallbackContext
+
+from benchmarks.fakes import FakeTelegramRequest, FakeUpstreams, build_profiles
+from benchmarks.updates import UpdateFactory, random_mint
+
+FLOWS = ("start", "coin_info", "buy_sell", "confirmation", "trades")
+
+
+def parse_pairs(value):
+    """
+    Parses "rpc=30,swap=120" into {"rpc": 30.0, "swap": 120.0}.
+    """
+    pairs = {}
+    for item in filter(None, (value or "").split(",")):
+        name, _, number = item.partition("=")
+        pairs[name.strip()] = float(number)
+    return pairs
+
+
+def percentile(samples, p):
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(round(p / 100 * (len(ordered) - 1))))]
+
+
+def summarize(samples, errors, elapsed):
+    return {
+        flow: {
+            "count": len(samples[flow]),
+            "errors": errors[flow],
+            "p50_ms": round(percentile(samples[flow], 50), 1),
+            "p90_ms": round(percentile(samples[flow], 90), 1),
+            "p99_ms": round(percentile(samples[flow], 99), 1),
+            "max_ms": round(max(samples[flow], default=0.0), 1),
+            "per_sec": round(len(samples[flow]) / elapsed, 1) if elapsed else 0.0,
+        }
+        for flow in FLOWS
+    }
+
+
+def print_report(results):
+    print(f"\n{'flow':<14}{'count':>8}{'errors':>8}{'p50 ms':>10}{'p90 ms':>10}{'p99 ms':>10}{'max ms':>10}{'per sec':>10}")
+    for flow, stats in results["flows"].items():
+        print(
+            f"{flow:<14}{stats['count']:>8}{stats['errors']:>8}{stats['p50_ms']:>10}"
+            f"{stats['p90_ms']:>10}{stats['p99_ms']:>10}{stats['max_ms']:>10}{stats['per_sec']:>10}"
+        )
+    print(f"\nWall time: {results['elapsed_s']} s, error replies sent: {results['error_replies']}")
+    print(f"Upstream calls: {results['upstream_calls']}")
+    print(f"Injected upstream errors: {results['upstream_errors']}")
+    print(f"Telegram calls: {results['telegram_calls']}")
+
+
+def regressions(results, baseline, tolerance):
+    """
+    Returns a line for every flow whose p90 is more than tolerance above the baseline.
+    """
+    found = []
+    for flow, stats in results["flows"].items():
+        before = baseline["flows"].get(flow, {}).get("p90_ms")
+        if before and stats["p90_ms"] > before * (1 + tolerance):
+            found.append(f"{flow}: p90 {before} ms -> {stats['p90_ms']} ms")
+    return found
+
+
+class Harness:
+    """
+    Times handler calls against one Application.
+    """
+
+    def __init__(self, application):
+        self.application = application
+        self.samples = {flow: [] for flow in FLOWS}
+        self.errors = {flow: 0 for flow in FLOWS}
+        self.updates = UpdateFactory(application.bot)
+
+    async def timed(self, flow, handler, update):
+        context = CallbackContext.from_update(update, self.application)
+        started = time.perf_counter()
+        try:
+            await handler(update, context)
+        except Exception as e:
+            self.errors[flow] += 1
+            print(f"{flow} raised: {e!r}")
+        finally:
+            self.samples[flow].append((time.perf_counter() - started) * 1000)
+
+
+async def run_user(harness, user_id, rounds, mints):
+    # Imported late, see run()
+    from handlers.coin_handler import handle_buy_sell, handle_coin_info, handle_confirmation
+    from handlers.start_handler import start
+    from handlers.wallet_handler import trades
+
+    for _ in range(rounds):
+        updates = harness.updates
+        await harness.timed("start", start, updates.message(user_id, "/start"))
+        mint = random.choice(mints)
+        await harness.timed("coin_info", handle_coin_info, updates.message(user_id, mint))
+        await harness.timed("buy_sell", handle_buy_sell, updates.callback(user_id, f"{random.choice(['buy_left', 'sell_left'])}:{mint}"))
+        await harness.timed("confirmation", handle_confirmation, updates.callback(user_id, "confirm"))
+        await harness.timed("trades", trades, updates.message(user_id, "/trades"))
+
+
+async def run(args):
+    fakes = FakeUpstreams(
+        build_profiles(parse_pairs(args.latency), parse_pairs(args.errors), args.jitter),
+        land_delay_ms=args.land_delay,
+    )
+    await fakes.start()
+
+    # Services read their configuration at import time, so point them at the fakes before importing main
+    os.environ.update(fakes.env())
+    os.environ.update({"PUBSUB_BACKEND": "memory", "SWAP_CONFIRMATION_MODE": "polling", "WALLET_WATCH": "false", "FILE_ID_CACHE_PATH": "", "METRICS_PORT": ""})
+
+    from main import build_application, post_init, post_shutdown
+
+    telegram_request = FakeTelegramRequest(fakes.profiles["telegram"])
+    application = build_application("1:bench", telegram_request, FakeTelegramRequest())
+
+    user_ids = list(range(1, args.users + 1))
+    fakes.seed_users(user_ids)
+    mints = [random_mint() for _ in range(args.mints)]
+
+    await application.initialize()
+    await post_init(application)
+    await application.start()
+
+    harness = Harness(application)
+    started = time.perf_counter()
+    try:
+        await asyncio.gather(*(run_user(harness, user_id, args.rounds, mints) for user_id in user_ids))
+        elapsed = time.perf_counter() - started
+    finally:
+        await application.stop()
+        await post_shutdown(application)
+        await application.shutdown()
+        await fakes.stop()
+
+    return {
+        "users": args.users,
+        "rounds": args.rounds,
+        "elapsed_s": round(elapsed, 2),
+        "flows": summarize(harness.samples, harness.errors, elapsed),
+        "error_replies": telegram_request.error_replies,
+        "upstream_calls": dict(fakes.calls),
+        "upstream_errors": dict(fakes.errors),
+        "telegram_calls": dict(telegram_request.calls),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--users", type=int, default=20, help="concurrent users")
+    parser.add_argument("--rounds", type=int, default=3, help="times each user runs every flow")
+    parser.add_argument("--mints", type=int, default=50, help="distinct mints users paste")
+    parser.add_argument("--latency", default="", help="per-upstream latency in ms, e.g. rpc=30,swap=120")
+    parser.add_argument("--errors", default="", help="per-upstream error rate, e.g. swap=0.02")
+    parser.add_argument("--jitter", type=float, default=0.2, help="latency jitter as a fraction of latency")
+    parser.add_argument("--land-delay", type=float, default=800, help="ms before a sent transaction confirms")
+    parser.add_argument("--json", help="write results to this file")
+    parser.add_argument("--baseline", help="results file from an earlier run to compare p90s against")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="allowed p90 regression against the baseline")
+    parser.add_argument("--seed", type=int, default=None, help="random seed")
+    args = parser.parse_args()
+
+    random.seed(args.seed)
+    results = asyncio.run(run(args))
+    print_report(results)
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            found = regressions(results, json.load(f), args.tolerance)
+        if found:
+            print("\nRegressions against baseline:")
+            for line in found:
+                print(f"  {line}")
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
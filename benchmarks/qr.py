@@ -0,0 +1,77 @@
+"""
+Cold versus warm QR rendering for Add Funds.
+
+Renders the QR code of a set of wallets three times through
+services.wallet_service.generate_qr_code: cold (nothing cached), from the
+disk cache (memory cache cleared) and from the memory cache. Reports
+per-call latency and the worst event loop lag seen while the calls ran.
+
+    python -m benchmarks.qr --wallets 200 --concurrency 20
+"""
+import argparse
+import asyncio
+import os
+import tempfile
+import time
+
+from benchmarks.load import sample_loop_lag, stats
+from benchmarks.updates import random_mint
+
+
+async def measure(generate_qr_code, public_keys, concurrency):
+    samples, lag_samples = [], []
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def render(public_key):
+        async with semaphore:
+            started = time.perf_counter()
+            await generate_qr_code(public_key)
+            samples.append((time.perf_counter() - started) * 1000)
+
+    lag_task = asyncio.create_task(sample_loop_lag(lag_samples))
+    started = time.perf_counter()
+    try:
+        await asyncio.gather(*(render(public_key) for public_key in public_keys))
+    finally:
+        elapsed = time.perf_counter() - started
+        lag_task.cancel()
+
+    return {
+        "renders": len(samples),
+        "per_sec": round(len(samples) / elapsed, 1),
+        "latency": stats(samples),
+        "loop_lag": stats(lag_samples),
+    }
+
+
+async def run(args):
+    with tempfile.TemporaryDirectory() as cache_dir:
+        os.environ["QR_CACHE_DIR"] = cache_dir
+        from services import wallet_service
+
+        public_keys = [random_mint() for _ in range(args.wallets)]
+        results = {"cold": await measure(wallet_service.generate_qr_code, public_keys, args.concurrency)}
+        wallet_service.qr_cache.clear()
+        results["disk"] = await measure(wallet_service.generate_qr_code, public_keys, args.concurrency)
+        results["memory"] = await measure(wallet_service.generate_qr_code, public_keys, args.concurrency)
+
+    print(f"{'cache':>8}{'renders':>9}{'per sec':>10}{'p50 ms':>9}{'p99 ms':>9}{'lag p99':>9}{'lag max':>9}")
+    for name, result in results.items():
+        print(
+            f"{name:>8}{result['renders']:>9}{result['per_sec']:>10}"
+            f"{result['latency']['p50_ms']:>9}{result['latency']['p99_ms']:>9}"
+            f"{result['loop_lag']['p99_ms']:>9}{result['loop_lag']['max_ms']:>9}"
+        )
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--wallets", type=int, default=200, help="distinct public keys to render")
+    parser.add_argument("--concurrency", type=int, default=20, help="renders in flight at once")
+    args = parser.parse_args()
+    asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    main()
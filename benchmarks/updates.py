@@ -0,0 +1,62 @@
+"""
+Synthetic Telegram updates for the benchmarks.
+"""
+import itertools
+import time
+
+from solders.keypair import Keypair
+from telegram import Update
+
+
+def random_mint():
+    # Any valid base58 public key passes the coin handler's mint extraction
+    return str(Keypair().pubkey())
+
+
+class UpdateFactory:
+    """
+    Builds Update objects bound to bot, as if they came from a private chat with user_id.
+    """
+
+    def __init__(self, bot):
+        self.bot = bot
+        self._update_ids = itertools.count(1)
+        self._message_ids = itertools.count(1_000_000)
+
+    def _user(self, user_id):
+        return {"id": user_id, "is_bot": False, "first_name": f"user{user_id}"}
+
+    def _message(self, user_id, text, from_bot=False):
+        return {
+            "message_id": next(self._message_ids),
+            "date": int(time.time()),
+            "chat": {"id": user_id, "type": "private"},
+            "from": {"id": 1, "is_bot": True, "first_name": "Bench"} if from_bot else self._user(user_id),
+            "text": text,
+        }
+
+    def message(self, user_id, text, reply_to=None):
+        """
+        A text message, optionally replying to a bot message with the text reply_to (a ForceReply answer).
+        """
+        message = self._message(user_id, text)
+        if text.startswith("/"):
+            message["entities"] = [{"type": "bot_command", "offset": 0, "length": len(text.split()[0])}]
+        if reply_to is not None:
+            message["reply_to_message"] = self._message(user_id, reply_to, from_bot=True)
+        return Update.de_json({"update_id": next(self._update_ids), "message": message}, self.bot)
+
+    def callback(self, user_id, data):
+        """
+        An inline keyboard press on a bot message.
+        """
+        return Update.de_json({
+            "update_id": next(self._update_ids),
+            "callback_query": {
+                "id": str(next(self._update_ids)),
+                "from": self._user(user_id),
+                "chat_instance": str(user_id),
+                "data": data,
+                "message": self._message(user_id, "bench", from_bot=True),
+            },
+        }, self.bot)
@@ -1,121 +1,175 @@
+import asyncio
+import re
+import time
+from solders.pubkey import Pubkey
 from telegram import InlineKeyboardButton, InlineKeyboardMarkup, ForceReply
-from solana.rpc.api import Client
 from handlers.utils import getRespFunc
-from services.coin_service import format_number, get_published_solana_coin_info, swap_coin_func
+from handlers.view import View
+from services.coin_service import QUOTE_PREFETCH, format_number, get_published_solana_coin_info, prefetch_preset_quotes, swap_coin_func
+from services.confirmation_service import EXPIRED, FAILED, LANDED
+from services.metrics import TRADE_CONFIRMATION_SECONDS, TRADE_STAGE_SECONDS
 from services.user_config_service import fetch_user_config
-from dotenv import load_dotenv
-import os
 
-# Load environment variables
-load_dotenv()
-SOLANA_RPC_URL = os.getenv("SOLANA_RPC_URL")
+CONFIRMATION_STATUS = {
+    LANDED: "✅ Transaction landed!",
+    FAILED: "❌ Transaction failed on chain.",
+    EXPIRED: "⌛ Transaction expired before it landed.",
+}
 
-client = Client(SOLANA_RPC_URL)
 
+# Base58 runs of 32-44 characters, bare or inside DEX Screener, pump.fun and Birdeye URLs
+MINT_PATTERN = re.compile(r"(?<![1-9A-HJ-NP-Za-km-z])[1-9A-HJ-NP-Za-km-z]{32,44}(?![1-9A-HJ-NP-Za-km-z])")
+MAX_MINTS_PER_MESSAGE = 5
+MAX_SESSION_COINS = 10  # Coin cards whose buttons keep working
 
-# Function to fetch coin information
-def fetch_coin_info(user_input):
-    """Match user input to a url or contract address."""
 
-    # check if URL & parse token address
-    if 'dexscreener.com/solana' in user_input:
-        user_input = user_input.split("/")[-1]
-    elif 'pump.fun/coin' in user_input:
-        user_input = user_input.split("/")[-1]
-    elif 'birdeye.so/token' in user_input:
-        user_input = user_input.split("/")[-1].split("?")[0]
-
-    # Check if the input is a 44-character contract address
-    if len(user_input) == 44:
-        return get_published_solana_coin_info(user_input)
-
-    # Default fallback
-    return {"error": "Invalid input. Please provide a valid contract address."}
+def extract_mints(text):
+    """
+    Returns every valid Solana address in text, in order and without duplicates.
+    Addresses are validated locally, nothing is looked up.
+    """
+    mints = []
+    for candidate in MINT_PATTERN.findall(text or ""):
+        if candidate in mints:
+            continue
+        try:
+            Pubkey.from_string(candidate)
+        except ValueError:
+            continue
+        mints.append(candidate)
+        if len(mints) == MAX_MINTS_PER_MESSAGE:
+            break
+    return mints
+
+
+async def _lookup(mint):
+    return mint, await get_published_solana_coin_info(mint)
+
+
+def _remember_coin(context, coin_info):
+    # Buttons carry the mint, this maps it back to the card's coin info
+    coins = context.user_data.setdefault('coins', {})
+    coins.pop(coin_info['mint_address'], None)
+    coins[coin_info['mint_address']] = coin_info
+    while len(coins) > MAX_SESSION_COINS:
+        coins.pop(next(iter(coins)))
+
+
+def _coin_card(coin_info, config):
+    # Round and format all values
+    price = format_number(coin_info.get('price'))
+    price_change_5m = format_number(coin_info.get('price_change_5m'))
+    price_change_1h = format_number(coin_info.get('price_change_1h'))
+    price_change_6h = format_number(coin_info.get('price_change_6h'))
+    price_change_24h = format_number(coin_info.get('price_change_24h'))
+    market_cap = format_number(coin_info.get('market_cap'))
+    mint = coin_info['mint_address']
+
+    # Generate buy/sell buttons
+    keyboard = [
+        [InlineKeyboardButton(f"Buy {config.get('buy_left')} SOL", callback_data=f"buy_left:{mint}"),
+         InlineKeyboardButton("Buy Custom", callback_data=f"buy_custom:{mint}"),
+         InlineKeyboardButton(f"Buy {config.get('buy_right')} SOL", callback_data=f"buy_right:{mint}")],
+        [InlineKeyboardButton(f"Sell {config.get('sell_left') * 100}%", callback_data=f"sell_left:{mint}"),
+         InlineKeyboardButton("Sell Custom", callback_data=f"sell_custom:{mint}"),
+         InlineKeyboardButton(f"Sell {config.get('sell_right') * 100}%", callback_data=f"sell_right:{mint}")],
+        [InlineKeyboardButton("Close", callback_data="close")]
+    ]
+    reply_markup = InlineKeyboardMarkup(keyboard)
+
+    # Create a pretty display message
+    message = (
+        f"🔎 *{coin_info['name']}* (`{coin_info['symbol']}`)\n"
+        f"--------------------------------\n"
+        f"💰 *Price*: {price} USD\n"
+        f"📈 *Market Cap*: ${market_cap}\n"
+        f"--------------------------------\n"
+        f"⏳ *Price Changes*:\n"
+        f"   - 5m: `{price_change_5m} %`\n"
+        f"   - 1h: `{price_change_1h} %`\n"
+        f"   - 6h: `{price_change_6h} %`\n"
+        f"   - 24h: `{price_change_24h} %`\n"
+        f"--------------------------------\n"
+        f"🏷️ *Mint Address*: `{mint}`\n"
+        f"--------------------------------\n"
+        f"📝 *Description*: {coin_info['description']}\n"
+        f"💻 [DEXSCREENER](https://dexscreener.com/solana/{mint})"
+    )
+
+    if mint.endswith("pump"):
+        message += f" | [PUMP.FUN](https://pump.fun/coin/{mint})"
+
+    return message, reply_markup
 
 
 # Handle incoming coin information
 async def handle_coin_info(update, context):
-    user_input = update.message.text
     func = getRespFunc(update)
-    loading_message = await func("🔄 Loading information, please wait...")
 
-    user_id = update.effective_user.id
-    config = fetch_user_config(user_id)
-
-    coin_info = fetch_coin_info(user_input)
-    if coin_info.get("error"):
-        await loading_message.delete()
-        await func(f"❌ {coin_info['error']}")
+    # Validate before anything touches the network
+    mints = extract_mints(update.message.text)
+    if not mints:
+        await func("❌ Invalid input. Please provide a valid contract address.")
         return
-    if coin_info:
-        # Store state in context.user_data
-        context.user_data['coin'] = coin_info['name']
-        context.user_data['coin_info'] = coin_info
-        context.user_data['action'] = None
-        context.user_data['amount'] = None
-
-
-        # Round and format all values
-        price = format_number(coin_info.get('price'))
-        price_change_5m = format_number(coin_info.get('price_change_5m'))
-        price_change_1h = format_number(coin_info.get('price_change_1h'))
-        price_change_6h = format_number(coin_info.get('price_change_6h'))
-        price_change_24h = format_number(coin_info.get('price_change_24h'))
-        market_cap = format_number(coin_info.get('market_cap'))
-
-        # Generate buy/sell buttons
-        keyboard = [
-            [InlineKeyboardButton(f"Buy {config.get('buy_left')} SOL", callback_data="buy_left"),
-             InlineKeyboardButton("Buy Custom", callback_data="buy_custom"),
-             InlineKeyboardButton(f"Buy {config.get('buy_right')} SOL", callback_data="buy_right")],
-            [InlineKeyboardButton(f"Sell {config.get('sell_left') * 100}%", callback_data="sell_left"),
-             InlineKeyboardButton("Sell Custom", callback_data="sell_custom"),
-             InlineKeyboardButton(f"Sell {config.get('sell_right') * 100}%", callback_data="sell_right")],
-            [InlineKeyboardButton("Close", callback_data="close")]
-        ]
-        reply_markup = InlineKeyboardMarkup(keyboard)
-
-        # message = f"🔎 *{coin_info['name']}*\n💰 Price: {coin_info['price']} SOL\nℹ️ {coin_info['description']}"
-        # await func(message, reply_markup=reply_markup, parse_mode="Markdown")
-            # Create a pretty display message
-        message = (
-            f"🔎 *{coin_info['name']}* (`{coin_info['symbol']}`)\n"
-            f"--------------------------------\n"
-            f"💰 *Price*: {price} USD\n"
-            f"📈 *Market Cap*: ${market_cap}\n"
-            f"--------------------------------\n"
-            f"⏳ *Price Changes*:\n"
-            f"   - 5m: `{price_change_5m} %`\n"
-            f"   - 1h: `{price_change_1h} %`\n"
-            f"   - 6h: `{price_change_6h} %`\n"
-            f"   - 24h: `{price_change_24h} %`\n"
-            f"--------------------------------\n"
-            f"🏷️ *Mint Address*: `{coin_info['mint_address']}`\n"
-            f"--------------------------------\n"
-            f"📝 *Description*: {coin_info['description']}\n"
-            f"💻 [DEXSCREENER](https://dexscreener.com/solana/{coin_info['mint_address']})"
-        )
 
-        if coin_info['mint_address'].endswith("pump"):
-            message += f" | [PUMP.FUN](https://pump.fun/coin/{coin_info['mint_address']})"
+    # The loading message only goes out for slow lookups, the first card or error replaces it
+    view = View.of(update, context)
+    view.show_later("🔄 Loading information, please wait...")
 
-        await loading_message.delete()
-        # If there's an image URL, attach the image
-        if coin_info.get("image_url"):
-            await update.message.reply_photo(photo=coin_info['image_url'], caption=message, reply_markup=reply_markup, parse_mode="Markdown")
-        else:
-            await func(message, reply_markup=reply_markup, parse_mode="Markdown")
-    else:
-        if loading_message: 
-            await loading_message.delete()
-        await func("❌ Coin not recognized. Please try again.")
+    user_id = update.effective_user.id
+    config_task = asyncio.ensure_future(fetch_user_config(user_id))
+
+    try:
+        # Look every mint up at once and show each card as soon as its info arrives
+        for lookup in asyncio.as_completed([_lookup(mint) for mint in mints]):
+            mint, coin_info = await lookup
+
+            if coin_info.get("error"):
+                prefix = f"`{mint}`: " if len(mints) > 1 else ""
+                await view.show(f"❌ {prefix}{coin_info['error']}", parse_mode="Markdown" if prefix else None)
+                view = View(context.bot, update.effective_chat.id)
+                continue
+
+            config = await config_task
+
+            # Store state in context.user_data
+            _remember_coin(context, coin_info)
+            context.user_data['coin'] = coin_info['name']
+            context.user_data['coin_info'] = coin_info
+            context.user_data['action'] = None
+            context.user_data['amount'] = None
+
+            message, reply_markup = _coin_card(coin_info, config)
+
+            # Quote the preset buttons while the user reads the card. Forwards with
+            # several mints would multiply quote traffic, so only single cards get this.
+            if QUOTE_PREFETCH and len(mints) == 1:
+                context.application.create_task(prefetch_preset_quotes(user_id, coin_info, config), update=update)
+
+            # If there's an image URL, attach the image. Every card gets its own message.
+            await view.show(message, reply_markup=reply_markup, parse_mode="Markdown", photo=coin_info.get("image_url") or None)
+            view = View(context.bot, update.effective_chat.id)
+    finally:
+        if not config_task.done():
+            config_task.cancel()
+        # Drops the loading message if no card made it out
+        await view.delete()
 
 # Handle button presses for buy/sell
 async def handle_buy_sell(update, context):
     query = update.callback_query
     await query.answer()
     func = getRespFunc(update)
-    action = query.data  # e.g., "buy_left", "buy_custom"
+    # e.g., "buy_left:<mint>", "buy_custom:<mint>". Cards sent before buttons carried the mint use the last coin.
+    action, _, mint = query.data.partition(":")
+
+    if mint:
+        coin_info = context.user_data.get('coins', {}).get(mint) or await get_published_solana_coin_info(mint)
+        if coin_info.get("error"):
+            await func(f"❌ {coin_info['error']}")
+            return
+        context.user_data['coin'] = coin_info['name']
+        context.user_data['coin_info'] = coin_info
 
     context.user_data['action'] = action
 
@@ -129,7 +183,7 @@ async def handle_buy_sell(update, context):
     else:
         # Preset buy/sell amount
         user_id = update.effective_user.id
-        config = fetch_user_config(user_id)
+        config = await fetch_user_config(user_id)
         preset_amount = config.get(action)
         context.user_data['amount'] = preset_amount
         coin_info = context.user_data['coin_info']
@@ -184,26 +238,53 @@ async def capture_amount_reply(update, context):
 async def handle_confirmation(update, context):
     query = update.callback_query
     await query.answer()
-    await query.message.delete()
-    func = getRespFunc(update)
-    loading_message = await func("🔄 Processing transaction, please wait...")
+    # The prompt turns into the progress and then the result message, one edit per step
+    view = View.of(update, context)
     action = context.user_data.get('action')
     amount = context.user_data.get('amount', 0)
     coin_info = context.user_data['coin_info']
 
     if query.data == "confirm":
-        res = await swap_coin_func(update, context, amount, coin_info, action.startswith("sell"))
+        await view.show("🔄 Processing transaction, please wait...")
+        started = time.perf_counter()
+        side = "sell" if action.startswith("sell") else "buy"
+        res = await swap_coin_func(update, context, amount, coin_info, side == "sell")
 
         if res.get("error"):
-            await loading_message.delete()
-            await func(f"❌ Error processing transaction: {res['error']}")
+            await view.show(f"❌ Error processing transaction: {res['error']}")
         else:
-            await loading_message.delete()
-            await func(f"✅ {res['message']}", parse_mode="Markdown", disable_web_page_preview=True)
+            message = await view.show(f"✅ {res['message']}", parse_mode="Markdown", disable_web_page_preview=True)
+            if res.get('confirmation'):
+                context.application.create_task(follow_confirmation(message, res, side), update=update)
+
+        TRADE_STAGE_SECONDS.labels(
+            stage="handler", side=side, outcome="error" if res.get("error") else "sent",
+        ).observe(time.perf_counter() - started)
     
     else:
-        await loading_message.delete()
-        await func("❌ Action canceled.")
+        await view.show("❌ Action canceled.")
+
+
+async def follow_confirmation(message, res, side):
+    """
+    Edits the transaction message once the confirmation tracker resolves the signature.
+    """
+    started = time.perf_counter()
+    try:
+        outcome, _ = await res['confirmation']
+    except asyncio.CancelledError:
+        return
+    TRADE_CONFIRMATION_SECONDS.labels(side=side, outcome=outcome).observe(time.perf_counter() - started)
+
+    try:
+        await message.edit_text(
+            f"{CONFIRMATION_STATUS[outcome]} Check your transaction here: "
+            f"[solscan.io](https://solscan.io/tx/{res['txid']})",
+            parse_mode="Markdown",
+            disable_web_page_preview=True
+        )
+    except Exception as e:
+        print(f"Error updating transaction status: {e}")
 
 
 # Handle close button
@@ -1,21 +1,13 @@
 from telegram import InlineKeyboardButton, InlineKeyboardMarkup
 from handlers.utils import getRespFunc
+from handlers.view import View
 from services.user_config_service import fetch_user_config, update_user_config
 from telegram import ForceReply
 
-async def settings(update, context):
+def settings_keyboard(config):
     """
-    Displays the Settings menu with dynamic buttons based on the user's current config.
+    Builds the Settings menu buttons, which show the user's current config.
     """
-    context.user_data.clear()
-    user_id = update.effective_user.id
-
-    # Fetch user configuration
-    config = fetch_user_config(user_id)
-    if not config:
-        await update.callback_query.message.reply_text("Error fetching your settings. Please try again.")
-        return
-
     priority_config = {
         'medium': InlineKeyboardButton(f"🔘 Medium: {config['tp_medium']} SOL", callback_data="settings_set_tp_medium"),
         'high': InlineKeyboardButton(f"🔘 High: {config['tp_high']} SOL", callback_data="settings_set_tp_high"),
@@ -45,7 +37,23 @@ async def settings(update, context):
         [InlineKeyboardButton("Close", callback_data="settings_close_settings")]
     ]
 
-    reply_markup = InlineKeyboardMarkup(keyboard)
+    return InlineKeyboardMarkup(keyboard)
+
+
+async def settings(update, context):
+    """
+    Displays the Settings menu with dynamic buttons based on the user's current config.
+    """
+    context.user_data.clear()
+    user_id = update.effective_user.id
+
+    # Fetch user configuration
+    config = await fetch_user_config(user_id)
+    if not config:
+        await update.callback_query.message.reply_text("Error fetching your settings. Please try again.")
+        return
+
+    reply_markup = settings_keyboard(config)
 
     detailed_message = """
 ⚙️ Settings Menu ⚙️
@@ -91,10 +99,10 @@ async def handle_settings_buttons(update, context):
     config_update = {}
     # Handle each button action
     if query.data == "settings_toggle_sell_initial":
-        current_value = fetch_user_config(user_id)['sell_initial']
+        current_value = (await fetch_user_config(user_id))['sell_initial']
         config_update['sell_initial'] = not current_value
     elif query.data == "settings_toggle_mev_protect":
-        current_value = fetch_user_config(user_id)['mev_protect']
+        current_value = (await fetch_user_config(user_id))['mev_protect']
         config_update['mev_protect'] = not current_value
     # Handle user input buttons with ForceReply
     elif query.data == "settings_set_buy_left":
@@ -134,7 +142,7 @@ async def handle_settings_buttons(update, context):
         return
     elif query.data == "settings_set_transaction_priority":
         priotity_opts = ['medium', 'high', 'very_high']
-        current_value = fetch_user_config(user_id)['transaction_priority']
+        current_value = (await fetch_user_config(user_id))['transaction_priority']
         config_update['transaction_priority'] = priotity_opts[(priotity_opts.index(current_value) + 1) % len(priotity_opts)]
     elif query.data == "settings_set_tp_medium":
         await query.message.reply_text(
@@ -165,8 +173,9 @@ async def handle_settings_buttons(update, context):
     
     # Update the user's config in Supabase
     if config_update:
-        update_user_config(user_id, config_update)
+        await update_user_config(user_id, config_update)
 
-    # Re-render the settings menu
-    await query.message.delete()
-    await settings(update, context)
\ No newline at end of file
+    # Only the buttons show the config, so update them in place
+    context.user_data.clear()
+    config = await fetch_user_config(user_id)
+    await View.of(update, context).show_markup(settings_keyboard(config))
\ No newline at end of file
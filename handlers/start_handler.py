@@ -2,6 +2,7 @@ from telegram import InlineKeyboardButton, InlineKeyboardMarkup
 from handlers.about_handler import about
 from handlers.utils import getRespFunc
 from handlers.wallet_handler import trades
+from services.file_id_cache import file_id_cache
 from services.wallet_service import create_wallet, get_wallet_info
 from services.user_config_service import create_user_config
 from telegram import ForceReply
@@ -9,6 +10,8 @@ from telegram import ForceReply
 from handlers.settings_handler import settings
 from telegram import BotCommand
 
+START_BANNER_URL = 'https://ezzsedfstvphracdawzp.supabase.co/storage/v1/object/public/assets/600x200.webp'
+
 async def start_transaction(update, context):
     user_id = update.effective_user.id
     func = getRespFunc(update)
@@ -45,7 +48,7 @@ async def start(update, context):
     user_id = update.effective_user.id
 
     # Check and create wallet if it doesn't exist
-    wallet = get_wallet_info(user_id)
+    wallet = await get_wallet_info(user_id)
     chat_id = update.effective_chat.id
     message = (
         f"Welcome to the Quickscope Bot! \n"
@@ -75,9 +78,10 @@ async def start(update, context):
     ]
     reply_markup = InlineKeyboardMarkup(keyboard)
 
-    await context.bot.send_photo(
+    await file_id_cache.send_photo(
+        context.bot,
         chat_id=chat_id,
-        photo='https://ezzsedfstvphracdawzp.supabase.co/storage/v1/object/public/assets/600x200.webp',
+        photo=START_BANNER_URL,
         caption=message,
         reply_markup=reply_markup,
         parse_mode="Markdown"
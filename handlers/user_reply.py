@@ -1,17 +1,8 @@
 from telegram import ForceReply
 from handlers.coin_handler import capture_amount_reply
 from handlers.sol_handler import send_sol_transaction
+from services.signer_service import lease_signer
 from services.user_config_service import update_user_config
-from supabase import create_client, Client
-from dotenv import load_dotenv
-import os
-
-load_dotenv()
-
-# Initialize Supabase client
-supabase_url = os.getenv("SUPABASE_URL")
-supabase_key = os.getenv("SUPABASE_KEY")
-supabase: Client = create_client(supabase_url, supabase_key)
 
 async def capture_user_reply(update, context):
     """
@@ -76,17 +67,10 @@ async def handle_send_sol(update, context, send_sol_stage):
             context.user_data['amount'] = amount
             wallet_address = context.user_data['wallet_address']
 
-            # Fetch user's wallet from Supabase
-            user_wallet_response = supabase.table('Wallets').select("*").eq('user_id', user_id).execute()
-            if user_wallet_response.data:
-                user_wallet = user_wallet_response.data[0]
-                sender_wallet = user_wallet['public_key']
-                sender_private_key = user_wallet['private_key']  # Handle securely
-
-                # Simulate sending SOL (replace with real implementation)
-                transaction_response = send_sol_transaction(
-                    sender_wallet, sender_private_key, wallet_address, amount
-                )
+            # Fetch user's wallet signer, leased until the transfer is signed and sent
+            async with lease_signer(user_id) as signer:
+                transaction_response = await send_sol_transaction(signer, wallet_address, amount) if signer else None
+            if signer:
 
                 if transaction_response['success']:
                     await update.message.reply_text((
@@ -143,7 +127,7 @@ async def handle_settings_reply(update, context, user_id, current_setting):
             return
 
         # Update the database
-        update_user_config(user_id, {current_setting: new_value})
+        await update_user_config(user_id, {current_setting: new_value})
 
         # new 
         # Delete the original settings menu if possible
@@ -0,0 +1,160 @@
+import asyncio
+import os
+from dotenv import load_dotenv
+from telegram.error import BadRequest
+
+from services.file_id_cache import file_id_cache
+
+load_dotenv()
+
+# Loading messages are only sent when the real answer takes longer than this many seconds
+VIEW_LOADING_DELAY = float(os.getenv("VIEW_LOADING_DELAY", 0.5))
+
+
+class View:
+    """
+    One message a flow keeps updating in place.
+
+    Each state change edits the message with editMessageText,
+    editMessageCaption or editMessageReplyMarkup instead of deleting it and
+    sending a new one, so it costs one Bot API call. A new message is only
+    sent when there is nothing to edit yet, when the message was deleted or
+    can no longer be edited, or when a photo has to replace plain text. Any
+    other rejected edit, e.g. bad Markdown, is raised.
+    """
+
+    def __init__(self, bot, chat_id, message=None):
+        self.bot = bot
+        self.chat_id = chat_id
+        self.message = message
+        self._rendered = None  # (text, reply_markup, photo) last shown, repeats are skipped
+        self._photo = None  # Photo the message was sent with
+        self._pending = None  # show_later() task
+        self._pending_started = False
+
+    @classmethod
+    def of(cls, update, context):
+        """
+        The view of the message a button was pressed on, or a view that sends a new message.
+        """
+        query = update.callback_query
+        if query is not None and query.message is not None:
+            return cls(context.bot, query.message.chat.id, query.message)
+        return cls(context.bot, update.effective_chat.id)
+
+    @property
+    def is_photo(self):
+        return bool(self.message is not None and self.message.photo)
+
+    def show_later(self, text, delay=VIEW_LOADING_DELAY, **kwargs):
+        """
+        Shows text after delay unless something else is shown first, e.g. a loading message.
+        """
+        async def show():
+            await asyncio.sleep(delay)
+            self._pending_started = True
+            await self._show(text, **kwargs)
+
+        self._pending = asyncio.ensure_future(show())
+
+    async def _settle_pending(self):
+        pending, self._pending = self._pending, None
+        if pending is None:
+            return
+        if not self._pending_started:
+            pending.cancel()
+            return
+        # Already sending, let it finish so its message is edited rather than orphaned
+        try:
+            await pending
+        except Exception as e:
+            print(f"Error showing pending view: {e}")
+
+    async def show(self, text, reply_markup=None, parse_mode=None, photo=None, **kwargs):
+        """
+        Shows text, with photo above it if given, in the view's message and returns that message.
+        """
+        await self._settle_pending()
+        return await self._show(text, reply_markup, parse_mode, photo, **kwargs)
+
+    async def _show(self, text, reply_markup=None, parse_mode=None, photo=None, **kwargs):
+        rendered = (text, reply_markup, photo)
+        if rendered == self._rendered:
+            return self.message
+
+        if self.message is not None and (photo is None or (self.is_photo and photo == self._photo)):
+            try:
+                if self.is_photo:
+                    message = await self.bot.edit_message_caption(
+                        chat_id=self.chat_id, message_id=self.message.message_id,
+                        caption=text, reply_markup=reply_markup, parse_mode=parse_mode,
+                    )
+                else:
+                    message = await self.bot.edit_message_text(
+                        text, chat_id=self.chat_id, message_id=self.message.message_id,
+                        reply_markup=reply_markup, parse_mode=parse_mode, **kwargs,
+                    )
+                if not isinstance(message, bool):
+                    self.message = message
+                self._rendered = rendered
+                return self.message
+            except BadRequest as e:
+                error = str(e).lower()
+                if "not modified" in error:
+                    self._rendered = rendered
+                    return self.message
+                if "message to edit not found" in error:
+                    self.message = None
+                elif "message can't be edited" in error:
+                    # Still on screen, remove it so its old state doesn't linger
+                    await self._delete()
+                else:
+                    raise
+                print(f"Can't edit the message, sending a new one: {e}")
+
+        # Plain text can't be edited into a photo, nor one photo into another, replace it
+        if self.message is not None:
+            await self._delete()
+
+        if photo is not None:
+            self.message = await file_id_cache.send_photo(
+                self.bot, chat_id=self.chat_id, photo=photo,
+                caption=text, reply_markup=reply_markup, parse_mode=parse_mode,
+            )
+            self._photo = photo
+        else:
+            self.message = await self.bot.send_message(
+                self.chat_id, text, reply_markup=reply_markup, parse_mode=parse_mode, **kwargs,
+            )
+        self._rendered = rendered
+        return self.message
+
+    async def show_markup(self, reply_markup):
+        """
+        Replaces only the buttons of the view's message.
+        """
+        await self._settle_pending()
+        if self.message is None:
+            return None
+        try:
+            await self.bot.edit_message_reply_markup(
+                chat_id=self.chat_id, message_id=self.message.message_id, reply_markup=reply_markup,
+            )
+        except BadRequest as e:
+            if "not modified" not in str(e):
+                raise
+        self._rendered = None
+        return self.message
+
+    async def delete(self):
+        await self._settle_pending()
+        await self._delete()
+
+    async def _delete(self):
+        message, self.message = self.message, None
+        self._rendered = None
+        if message is not None:
+            try:
+                await self.bot.delete_message(chat_id=self.chat_id, message_id=message.message_id)
+            except BadRequest as e:
+                print(f"Error deleting message {message.message_id}: {e}")
@@ -1,56 +1,79 @@
 from telegram import InlineKeyboardButton, InlineKeyboardMarkup, Update
+from telegram.helpers import escape_markdown
 from handlers.utils import getRespFunc
+from services.file_id_cache import file_id_cache
 from services.wallet_service import fetch_trades, get_wallet_info, generate_qr_code, get_wallet_public_key
 
-from math import ceil
-
 
 PAGE_SIZE = 5  # Number of transactions per page
 
+def _trades_page(result):
+    """Render one page of the wallet's coins, with Prev/Next buttons."""
+    page, total_pages = result["page"], result["total_pages"]
+    message = (
+        "📈 Your Coins\n"
+        "---------------------------------------\n\n"
+    )
+
+    for coin in result["trades"]:
+        message += (
+            f"Name: {escape_markdown(coin['name'])}\n"
+            f"Symbol: {escape_markdown(coin['symbol'])}\n"
+            f"Balance: {escape_markdown(coin['balance'])}\n"
+            f"USD Value: {coin['usd_value']}\n\n"
+            f"Mint Address: `{coin['mint_address']}` (tap to copy)\n\n"
+            "---------------------------------------\n\n"
+        )
+    message += f"Page {page} of {total_pages} ({result['total']} coins)"
+
+    navigation = []
+    if page > 1:
+        navigation.append(InlineKeyboardButton("◀ Prev", callback_data=f"trades_page_{page - 1}"))
+    if page < total_pages:
+        navigation.append(InlineKeyboardButton("Next ▶", callback_data=f"trades_page_{page + 1}"))
+    keyboard = [navigation] if navigation else []
+    keyboard.append([InlineKeyboardButton("Close", callback_data="close")])
+    return message, InlineKeyboardMarkup(keyboard)
+
 async def trades(update, context):
     user_id = update.effective_user.id
     func = getRespFunc(update)
     loading_message = await func("🔄 Loading your wallet, please wait...")
 
     # Get user's wallet public key
-    public_key = get_wallet_public_key(user_id)
+    public_key = await get_wallet_public_key(user_id)
     if not public_key:
-        await func("No wallet found for this user.")
+        await loading_message.edit_text("No wallet found for this user.")
         return
 
     # Fetch the first page of transactions
-    coins = await fetch_trades(public_key, 1, PAGE_SIZE)
-    if not coins:
-        await func("No transactions found for this wallet.")
+    result = await fetch_trades(public_key, 1, PAGE_SIZE)
+    if not result["trades"]:
+        await loading_message.edit_text("No transactions found for this wallet.")
         return
 
-    message = (
-        "📈 Your Coins\n"
-        "---------------------------------------\n\n"
-    )
-
-    for coin in coins:
-        message += (
-            f"Name: {coin['name']}\n"
-            f"Symbol: {coin['symbol']}\n"
-            f"Balance: {coin['balance']}\n"
-            f"USD Value: {coin['usd_value']}\n\n"
-            f"Mint Address: `{coin['mint_address']}` (tap to copy)\n\n"
-            "---------------------------------------\n\n"
-        )
-
-    await loading_message.edit_text(message, reply_markup=InlineKeyboardMarkup([[InlineKeyboardButton("Close", callback_data="close")]]), parse_mode="Markdown")
+    message, reply_markup = _trades_page(result)
+    await loading_message.edit_text(message, reply_markup=reply_markup, parse_mode="Markdown")
     return
 
 async def trades_callback_handler(update, context):
     """Handle pagination and message deletion for trades."""
-    func = getRespFunc(update)
     query = update.callback_query
     await query.answer()
 
     data = query.data
     if data.startswith("trades_page_"):
-        return
+        page = int(data[len("trades_page_"):])
+        public_key = await get_wallet_public_key(update.effective_user.id)
+        if not public_key:
+            return
+
+        # Served from the wallet's cached snapshot, the page is edited in place
+        result = await fetch_trades(public_key, page, PAGE_SIZE)
+        if not result["trades"]:
+            return
+        message, reply_markup = _trades_page(result)
+        await query.message.edit_text(message, reply_markup=reply_markup, parse_mode="Markdown")
     elif data == "trades_delete_message":
         await query.message.delete()
 
@@ -59,7 +82,7 @@ async def wallet_info(update: Update, context):
     Fetch and display the wallet information.
     """
     user_id = update.effective_user.id
-    wallet = get_wallet_info(user_id)
+    wallet = await get_wallet_info(user_id)
 
     keyboard = [
         
@@ -87,11 +110,10 @@ async def add_funds(update: Update, context):
     Provide funding options: MoonPay or QR code.
     """
     user_id = update.effective_user.id
-    wallet = get_wallet_info(user_id)
+    wallet = await get_wallet_info(user_id)
 
     public_key = wallet['public_key']
     moonpay_url = f"https://www.moonpay.com/"
-    qr_image = generate_qr_code(public_key)
 
     message = (
         f"Public Key as a QR code ⬆️\n\n"
@@ -106,4 +128,8 @@ async def add_funds(update: Update, context):
     reply_markup = InlineKeyboardMarkup([[InlineKeyboardButton("Close", callback_data="close")]])
 
 
-    await context.bot.send_photo(photo=qr_image, caption=message, parse_mode="Markdown", reply_markup=reply_markup ,chat_id=update.effective_chat.id)
\ No newline at end of file
+    # The QR only depends on the public key, once uploaded its file_id is sent instead
+    await file_id_cache.send_photo(
+        context.bot, photo=lambda: generate_qr_code(public_key), key=f"qr:{public_key}",
+        caption=message, parse_mode="Markdown", reply_markup=reply_markup, chat_id=update.effective_chat.id,
+    )
\ No newline at end of file
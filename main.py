@@ -5,19 +5,72 @@ from handlers.start_handler import about, send_sol, start, menu_handler, start_t
 from handlers.wallet_handler import trades_callback_handler, wallet_info, add_funds
 from handlers.settings_handler import settings, handle_settings_buttons
 from handlers.user_reply import capture_user_reply
+from services.blockhash_service import blockhash_prefetcher
+from services.confirmation_service import confirmation_tracker
+from services.file_id_cache import file_id_cache
+from services.http_client import close_clients
+from services.metrics import UPDATE_QUEUE_DEPTH, start_metrics_server
+from services.rpc_pool import rpc_pool
+from services.rpc_websocket import close_websockets
+from services.state_store import user_data_persistence
+from services.supervisor import SUPERVISOR_WORKERS, run_supervisor
+from services.update_processor import OrderedUpdateProcessor
+from services.user_config_service import start_config_sync, stop_config_sync
+from services.wallet_watcher import wallet_watcher
+from services.webhook_server import run_webhook
 
+import asyncio
 import os
 from dotenv import load_dotenv
 
 load_dotenv()
 
-def main():
+# "polling" for development, "webhook" behind a load balancer
+BOT_MODE = os.getenv("BOT_MODE", "polling")
+
+async def post_init(application):
     """
-    Main function to initialize and start the Telegram bot.
+    Starts background services once the Application is initialized.
     """
+    start_metrics_server(application)
+    await start_config_sync(application)
+    await rpc_pool.start(application)
+    await blockhash_prefetcher.start(application)
+    await wallet_watcher.start(application)
+    await file_id_cache.start(application)
 
-    TELEGRAM_BOT_KEY = os.getenv("TELEGRAM_BOT_KEY")
-    application = ApplicationBuilder().token(TELEGRAM_BOT_KEY).build()
+async def post_shutdown(application):
+    """
+    Stops background services and releases pooled connections.
+    """
+    await wallet_watcher.stop(application)
+    await confirmation_tracker.stop(application)
+    await blockhash_prefetcher.stop(application)
+    await rpc_pool.stop(application)
+    await stop_config_sync(application)
+    await file_id_cache.stop(application)
+    await close_websockets(application)
+    await close_clients(application)
+
+def build_application(token, request=None, get_updates_request=None):
+    """
+    Builds the Application with every handler registered.
+    request and get_updates_request replace the Bot API transports, e.g. for load tests.
+    """
+    builder = (
+        ApplicationBuilder()
+        .token(token)
+        .concurrent_updates(OrderedUpdateProcessor())
+        .persistence(user_data_persistence)
+        .post_init(post_init)
+        .post_shutdown(post_shutdown)
+    )
+    if request is not None:
+        builder = builder.request(request)
+    if get_updates_request is not None:
+        builder = builder.get_updates_request(get_updates_request)
+    application = builder.build()
+    UPDATE_QUEUE_DEPTH.set_function(application.update_queue.qsize)
 
     # Register handlers
     application.add_handler(CommandHandler("start", start))
@@ -43,8 +96,26 @@ def main():
     application.add_handler(CallbackQueryHandler(handle_confirmation, pattern="^(confirm|cancel)$"))
     application.add_handler(CallbackQueryHandler(close, pattern="close"))
 
-    # Start polling
-    application.run_polling()
+    return application
+
+def main():
+    """
+    Main function to initialize and start the Telegram bot.
+    """
+
+    TELEGRAM_BOT_KEY = os.getenv("TELEGRAM_BOT_KEY")
+
+    # Shard users over worker processes, each running its own Application
+    if SUPERVISOR_WORKERS > 0:
+        asyncio.run(run_supervisor(build_application, TELEGRAM_BOT_KEY, BOT_MODE))
+        return
+
+    application = build_application(TELEGRAM_BOT_KEY)
+
+    if BOT_MODE == "webhook":
+        asyncio.run(run_webhook(application))
+    else:
+        application.run_polling()
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
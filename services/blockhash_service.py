@@ -0,0 +1,118 @@
+import asyncio
+import os
+import time
+from dotenv import load_dotenv
+from solana.rpc.commitment import Confirmed
+
+from services.rpc_pool import rpc_pool
+
+load_dotenv()
+
+BLOCKHASH_REFRESH_INTERVAL = float(os.getenv("BLOCKHASH_REFRESH_INTERVAL", 2))
+# A blockhash is treated as stale once fewer than this many blocks remain before it expires
+BLOCKHASH_MIN_REMAINING_BLOCKS = int(os.getenv("BLOCKHASH_MIN_REMAINING_BLOCKS", 60))
+SLOT_TIME = 0.4  # Average seconds per block, used to estimate height between refreshes
+
+
+class BlockhashPrefetcher:
+    """
+    Keeps a recent blockhash and its last_valid_block_height in memory.
+
+    A background task refreshes it every `interval` seconds so signers can read it
+    without an RPC round trip. If the task isn't running, or the cached value has
+    gone stale, get() fetches one inline.
+    """
+
+    def __init__(self, interval=BLOCKHASH_REFRESH_INTERVAL, min_remaining_blocks=BLOCKHASH_MIN_REMAINING_BLOCKS):
+        self.interval = interval
+        self.min_remaining_blocks = min_remaining_blocks
+        self._latest = None  # RpcBlockhash with .blockhash and .last_valid_block_height
+        self._block_height = None
+        self._fetched_at = None
+        self._started_at = None  # When the cached value's fetch was sent
+        self._task = None
+        self._lock = asyncio.Lock()
+        self._reported_stale = False
+
+    def estimated_block_height(self):
+        if self._block_height is None:
+            return None
+        return self._block_height + int((time.monotonic() - self._fetched_at) / SLOT_TIME)
+
+    def remaining_blocks(self):
+        """
+        Estimated number of blocks before the cached blockhash expires, or None if nothing is cached.
+        """
+        if self._latest is None:
+            return None
+        return self._latest.last_valid_block_height - self.estimated_block_height()
+
+    def is_stale(self):
+        remaining = self.remaining_blocks()
+        return remaining is None or remaining < self.min_remaining_blocks
+
+    async def refresh(self, stale_only=False):
+        """
+        Fetches a new blockhash and the current block height and caches them.
+
+        Callers queued behind a refresh that was sent after they asked reuse
+        its result, and with stale_only so do callers that find a fresh value.
+        """
+        requested_at = time.monotonic()
+        async with self._lock:
+            if self._started_at is not None and self._started_at >= requested_at:
+                return self._latest
+            if stale_only and not self.is_stale():
+                return self._latest
+
+            started_at = time.monotonic()
+            blockhash_resp, height_resp = await rpc_pool.run("read", lambda rpc_client: asyncio.gather(
+                rpc_client.get_latest_blockhash(Confirmed),
+                rpc_client.get_block_height(Confirmed),
+            ))
+            self._latest = blockhash_resp.value
+            self._block_height = height_resp.value
+            self._fetched_at = time.monotonic()
+            self._started_at = started_at
+            self._reported_stale = False
+            return self._latest
+
+    async def get(self, force_refresh=False):
+        """
+        Returns the cached blockhash, fetching a new one first if it is stale or force_refresh is set.
+        """
+        if force_refresh:
+            return await self.refresh()
+        if self.is_stale():
+            # Re-checked under the lock, so concurrent callers share one fetch
+            return await self.refresh(stale_only=True)
+        return self._latest
+
+    async def _run(self):
+        while True:
+            try:
+                await self.refresh()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f"Error refreshing blockhash: {e}")
+                if self.is_stale() and not self._reported_stale:
+                    self._reported_stale = True
+                    print(f"Cached blockhash is stale ({self.remaining_blocks()} blocks remaining)")
+            await asyncio.sleep(self.interval)
+
+    async def start(self, _application=None):
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self, _application=None):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+
+blockhash_prefetcher = BlockhashPrefetcher()
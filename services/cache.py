@@ -0,0 +1,137 @@
+import asyncio
+import time
+from collections import OrderedDict
+
+
+class AsyncTTLCache:
+    """
+    Bounded LRU cache with per-entry TTL and single-flight loading.
+
+    Concurrent misses for the same key share one in-flight fetch instead of
+    each calling the upstream. Writing or popping a key detaches its in-flight
+    fetch, so a fetch that started before the write can't overwrite it.
+    `on_evict(key, value)` is called whenever an entry leaves the cache (LRU
+    eviction, expiry, replacement, pop or clear).
+    """
+
+    def __init__(self, maxsize=1024, ttl=60, on_evict=None):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.on_evict = on_evict
+        self._data = OrderedDict()  # key -> (expires_at, value)
+        self._pending = {}  # key -> in-flight fetch task
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.evictions = 0
+
+    def __len__(self):
+        return len(self._data)
+
+    def __contains__(self, key):
+        entry = self._data.get(key)
+        return entry is not None and entry[0] > time.monotonic()
+
+    def get(self, key, default=None):
+        """
+        Returns the cached value for key, or default if it is missing or expired.
+        """
+        entry = self._data.get(key)
+        if entry is not None:
+            expires_at, value = entry
+            if expires_at > time.monotonic():
+                self._data.move_to_end(key)
+                self.hits += 1
+                return value
+            self._discard(key)
+        self.misses += 1
+        return default
+
+    def set(self, key, value, ttl=None):
+        """
+        Stores value under key, evicting the least recently used entries when full.
+        A fetch for key still in flight won't overwrite it.
+        """
+        self._pending.pop(key, None)
+        ttl = self.ttl if ttl is None else ttl
+        old = self._data.get(key)
+        if old is not None and old[1] is not value:
+            self._discard(key)
+        self._data[key] = (time.monotonic() + ttl, value)
+        self._data.move_to_end(key)
+        while len(self._data) > self.maxsize:
+            self._evict(next(iter(self._data)))
+
+    def pop(self, key, default=None):
+        """
+        Removes key from the cache and returns its value. A fetch for key still
+        in flight won't store its result.
+        """
+        self._pending.pop(key, None)
+        value = self._discard(key)
+        return default if value is None else value
+
+    def clear(self):
+        for key in list(self._data):
+            self._discard(key)
+
+    def expire(self):
+        """
+        Drops every expired entry now rather than on its next lookup.
+        """
+        now = time.monotonic()
+        for key in [key for key, (expires_at, _) in self._data.items() if expires_at <= now]:
+            self._discard(key)
+
+    def _evict(self, key):
+        self._discard(key)
+        self.evictions += 1
+
+    def _discard(self, key):
+        entry = self._data.pop(key, None)
+        if entry is None:
+            return None
+        if self.on_evict is not None:
+            self.on_evict(key, entry[1])
+        return entry[1]
+
+    async def get_or_fetch(self, key, fetch, ttl=None):
+        """
+        Returns the cached value for key, calling the `fetch` coroutine function on a miss.
+
+        Only one fetch runs per key at a time; other callers wait for its result.
+        Exceptions are propagated to every waiter and are not cached.
+        """
+        value = self.get(key)
+        if value is not None:
+            return value
+
+        pending = self._pending.get(key)
+        if pending is not None:
+            self.coalesced += 1
+        else:
+            pending = asyncio.ensure_future(fetch())
+            self._pending[key] = pending
+
+            def _store(task):
+                # A set() or pop() while in flight detached this fetch, its result is older
+                if self._pending.get(key) is not task:
+                    return
+                del self._pending[key]
+                if not task.cancelled() and task.exception() is None:
+                    self.set(key, task.result(), ttl)
+
+            pending.add_done_callback(_store)
+
+        # Shield so one cancelled caller doesn't cancel the fetch for the others
+        return await asyncio.shield(pending)
+
+    def stats(self):
+        return {
+            "size": len(self._data),
+            "maxsize": self.maxsize,
+            "hits": self.hits,
+            "misses": self.misses,
+            "coalesced": self.coalesced,
+            "evictions": self.evictions,
+        }
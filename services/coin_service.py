@@ -1,13 +1,15 @@
-import base64
-from solana.rpc.api import Client
-from solders.keypair import Keypair
+import asyncio
+import time
 from solders.pubkey import Pubkey
 from solanatracker import SolanaTracker
+from services.cache import AsyncTTLCache
+from services.http_client import get_http_client
+from services.metrics import TRADE_STAGE_SECONDS, TRADES_TOTAL, UPSTREAM_REQUEST_SECONDS, observe
+from services.rpc_pool import rpc_pool
+from services.signer_service import acquire_signer, lease_signer
 from services.user_config_service import fetch_user_config
-import requests
 from dotenv import load_dotenv
 import os
-from supabase import create_client, Client as SupabaseClient
 from solana.rpc.types import TokenAccountOpts
 
 
@@ -16,37 +18,57 @@ JUPITER_API_URL = "https://quote-api.jup.ag/v6"
 # Load environment variables
 load_dotenv()
 
-SOLANA_RPC_URL = os.getenv("SOLANA_RPC_URL")
 SOL_TRACKER_KEY = os.getenv("SOL_TRACKER_KEY")
-client = Client(SOLANA_RPC_URL)
-
-# Initialize Supabase client
-supabase_url = os.getenv("SUPABASE_URL")
-supabase_key = os.getenv("SUPABASE_KEY")
-supabase: SupabaseClient = create_client(supabase_url, supabase_key)
+# httpx rejects a None header, so the key is only sent when it is set
+SOL_TRACKER_HEADERS = {"x-api-key": SOL_TRACKER_KEY} if SOL_TRACKER_KEY else {}
+SOL_TRACKER_DATA_URL = os.getenv("SOL_TRACKER_DATA_URL", "https://data.solanatracker.io")
+
+# Token info is keyed by mint. Price and change fields come back in the same
+# response as the metadata, so the whole record shares the short price TTL.
+TOKEN_INFO_TTL = float(os.getenv("TOKEN_INFO_TTL", 5))
+TOKEN_INFO_CACHE_SIZE = int(os.getenv("TOKEN_INFO_CACHE_SIZE", 2048))
+token_info_cache = AsyncTTLCache(maxsize=TOKEN_INFO_CACHE_SIZE, ttl=TOKEN_INFO_TTL)
+
+# Quotes prefetched for the card's preset buttons stay usable for this many seconds
+QUOTE_FRESHNESS = float(os.getenv("QUOTE_FRESHNESS", 10))
+QUOTE_CACHE_SIZE = int(os.getenv("QUOTE_CACHE_SIZE", 4096))
+QUOTE_PREFETCH = os.getenv("QUOTE_PREFETCH", "true").lower() == "true"
+quote_cache = AsyncTTLCache(maxsize=QUOTE_CACHE_SIZE, ttl=QUOTE_FRESHNESS)
+PRESET_ACTIONS = ("buy_left", "buy_right", "sell_left", "sell_right")
 
 SOL_MINT_ADDRESS = "So11111111111111111111111111111111111111112"
+SWAP_CONFIRMATION_MODE = os.getenv("SWAP_CONFIRMATION_MODE", "polling")  # "polling" or "websocket"
 
-def get_published_solana_coin_info(mint_address):
-    try:
-        # Fetch token price using Jupiter API
-        price_data = requests.get(f'https://data.solanatracker.io/tokens/{mint_address}', headers={'x-api-key': SOL_TRACKER_KEY})
+async def _fetch_solana_coin_info(mint_address):
+    # Fetch token price using Jupiter API
+    url = f'{SOL_TRACKER_DATA_URL}/tokens/{mint_address}'
+    with observe(UPSTREAM_REQUEST_SECONDS, upstream="token_info"):
+        price_data = await get_http_client(url).get(url, headers=SOL_TRACKER_HEADERS)
         price_data = price_data.json()
 
 
-        return {
-            "name": price_data['token']['name'],
-            "symbol": price_data['token']['symbol'],
-            "description": price_data['token']['description'],
-            "image_url": price_data['token']['image'],
-            "mint_address": mint_address,
-            "price": price_data['pools'][0]['price']['usd'],
-            "price_change_5m": price_data['events']['5m']['priceChangePercentage'],
-            "price_change_1h": price_data['events']['1h']['priceChangePercentage'],
-            "price_change_6h": price_data['events']['6h']['priceChangePercentage'],
-            "price_change_24h": price_data['events']['24h']['priceChangePercentage'],
-            "market_cap": price_data['pools'][0]['marketCap']['usd'],
-        }
+    return {
+        "name": price_data['token']['name'],
+        "symbol": price_data['token']['symbol'],
+        "description": price_data['token']['description'],
+        "image_url": price_data['token']['image'],
+        "mint_address": mint_address,
+        "price": price_data['pools'][0]['price']['usd'],
+        "price_change_5m": price_data['events']['5m']['priceChangePercentage'],
+        "price_change_1h": price_data['events']['1h']['priceChangePercentage'],
+        "price_change_6h": price_data['events']['6h']['priceChangePercentage'],
+        "price_change_24h": price_data['events']['24h']['priceChangePercentage'],
+        "market_cap": price_data['pools'][0]['marketCap']['usd'],
+    }
+
+
+async def get_published_solana_coin_info(mint_address):
+    """
+    Returns token info for the mint, served from the token cache while the price is fresh.
+    """
+    try:
+        coin_info = await token_info_cache.get_or_fetch(mint_address, lambda: _fetch_solana_coin_info(mint_address))
+        return dict(coin_info)
 
     except Exception as e:
         return {"error": f"Error fetching contract information: {str(e)}"}
@@ -74,69 +96,154 @@ def format_number(value, allow_commas=False):
         return "N/A"
     
 
-async def swap_coin_func(update, context, amount, coin_info, is_sell):
-    user_id = update.effective_user.id
-    config = fetch_user_config(user_id)
-
-    # IF BUY - CHECK WALLET BALANCE
+class PreTradeError(Exception):
+    """
+    Raised by a pre-trade check that disqualifies the trade.
+    """
 
-    # Fetch user's wallet
-    user_wallet_response = supabase.table('Wallets').select("*").eq('user_id', user_id).execute()
-    if not user_wallet_response.data:
-        return {'error': "No wallet found for the user."}
 
-    user_wallet = user_wallet_response.data[0]
-    sender_wallet = user_wallet['public_key']
-    sender_private_key = user_wallet['private_key']
+async def _timed(timings, stage, aw):
+    """
+    Awaits aw and records how long it took, in milliseconds, under timings[stage].
+    """
+    started = time.perf_counter()
+    try:
+        return await aw
+    finally:
+        timings[stage] = round((time.perf_counter() - started) * 1000, 1)
 
-    if not sender_private_key:
-        return {'error': "Private key not set. Unable to proceed."}
-    
 
-    sender_private_key_bytes = base64.b64decode(sender_private_key)
-    sender_public_key_bytes = bytes(Pubkey.from_string(sender_wallet))
-    # Combine the 32-byte secret key with the 32-byte public key to form the full 64-byte private key
-    full_private_key = sender_private_key_bytes + sender_public_key_bytes
-    sender_keypair = Keypair.from_bytes(full_private_key)
-    solana_tracker = SolanaTracker(sender_keypair, "https://rpc.solanatracker.io/public?advancedTx=true") # Your RPC Here
+async def _run_fail_fast(*aws):
+    """
+    Runs every awaitable concurrently and returns their results in order.
+    The first exception cancels whatever is still running and is re-raised.
+    """
+    tasks = [asyncio.ensure_future(aw) for aw in aws]
+    try:
+        done, _ = await asyncio.wait(tasks, return_when=asyncio.FIRST_EXCEPTION)
+        for task in tasks:
+            if task in done and task.exception() is not None:
+                raise task.exception()
+        return [task.result() for task in tasks]
+    finally:
+        pending = [task for task in tasks if not task.done()]
+        for task in pending:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+
+def _record_trade(timings, is_sell, outcome):
+    side = "sell" if is_sell else "buy"
+    TRADES_TOTAL.labels(side=side, outcome=outcome).inc()
+    for stage, elapsed_ms in timings.items():
+        TRADE_STAGE_SECONDS.labels(stage=stage, side=side, outcome=outcome).observe(elapsed_ms / 1000)
+
+
+async def get_swap_quote(signer, config, mint_address, amount, is_sell, consume=False):
+    """
+    Returns swap instructions for the trade, reusing a cached quote while it is
+    still within QUOTE_FRESHNESS. With consume the quote is dropped from the
+    cache so it is never executed twice.
+    """
     priority = config['transaction_priority']
     priority_fee = config[f"tp_{priority}"]
-
     slippage = config['slippage_sell'] if is_sell else config['slippage_buy']
     final_amount = f"{amount * 100}%" if is_sell else amount
-    from_token = coin_info['mint_address'] if is_sell else SOL_MINT_ADDRESS
-    to_token = SOL_MINT_ADDRESS if is_sell else coin_info['mint_address']
+    from_token = mint_address if is_sell else SOL_MINT_ADDRESS
+    to_token = SOL_MINT_ADDRESS if is_sell else mint_address
 
-    try:
+    async def fetch():
+        swap_response = await SolanaTracker(signer, rpc_pool.pick("send")).get_swap_instructions(
+            from_token,  # From Token
+            to_token,  # To Token
+            final_amount,  # Amount to swap
+            slippage * 100,  # Slippage
+            str(signer.pubkey()),  # Payer public key
+            priority_fee,  # Priority fee (Recommended while network is congested)
+            True,  # Force legacy transaction for Jupiter
+        )
+        if "txn" not in swap_response:
+            raise Exception(swap_response.get("error", "Unable to get a swap quote."))
+        return swap_response
+
+    # Settings are part of the key so a changed slippage or fee never reuses an old quote
+    key = (str(signer.pubkey()), mint_address, is_sell, amount, slippage, priority_fee)
+    swap_response = await quote_cache.get_or_fetch(key, fetch)
+    if consume:
+        quote_cache.pop(key)
+    return swap_response
+
+
+async def prefetch_preset_quotes(user_id, coin_info, config):
+    """
+    Fetches quotes for the card's preset buy and sell buttons in the background,
+    so confirming a preset trade can go straight to signing.
+    """
+    async with lease_signer(user_id) as signer:
+        if not signer:
+            return
+
+        # Sell quotes fail when the user holds none of the token, that's expected here
+        await asyncio.gather(*(
+            get_swap_quote(signer, config, coin_info['mint_address'], config[action], action.startswith("sell"))
+            for action in PRESET_ACTIONS
+        ), return_exceptions=True)
+
+
+async def swap_coin_func(update, context, amount, coin_info, is_sell):
+    user_id = update.effective_user.id
+    timings = {}
+    outcome = "error"
+    started = time.perf_counter()
+
+    # Config and wallet lookups have no dependencies, start both right away
+    config_task = asyncio.ensure_future(_timed(timings, "config", fetch_user_config(user_id)))
+    # Leased so the seed can't be zeroed by a cache eviction mid-trade, released in finally
+    signer_task = asyncio.ensure_future(_timed(timings, "wallet", acquire_signer(user_id)))
+
+    async def check_wallet():
+        # Fetch user's wallet signer (cached after the first trade)
+        signer = await signer_task
+        if not signer:
+            raise PreTradeError("No wallet found for the user.")
+        return signer
+
+    async def check_balance():
+        signer = await check_wallet()
 
         # Check user's token balance for sales
         if is_sell:
-            token_balance_response = client.get_token_accounts_by_owner(
-                sender_keypair.pubkey(), TokenAccountOpts(
+            token_balance_response = await _timed(timings, "balance", rpc_pool.run("read", lambda rpc_client: rpc_client.get_token_accounts_by_owner(
+                signer.pubkey(), TokenAccountOpts(
                     mint=Pubkey.from_string(coin_info["mint_address"])
                 )
-            )
+            )))
             token_balance_response = token_balance_response.value
 
             if len(token_balance_response) == 0 or token_balance_response[0].account.lamports < 1:
-                return {
-                    'error': f"You do not have enough {coin_info['symbol']} to complete this trade. "
-                }
+                raise PreTradeError(f"You do not have enough {coin_info['symbol']} to complete this trade. ")
+            return None
 
-        swap_response = await solana_tracker.get_swap_instructions(
-            from_token,  # From Token
-            to_token,  # To Token
-            final_amount,  # Amount to swap
-            slippage * 100,  # Slippage
-            str(sender_keypair.pubkey()),  # Payer public key
-            priority_fee,  # Priority fee (Recommended while network is congested)
-            True,  # Force legacy transaction for Jupiter
-        )
+        # IF BUY - CHECK WALLET BALANCE
+        # The quote adds fees on top, so a balance below the amount itself can fail right away
+        sol_balance = (await _timed(timings, "balance", rpc_pool.run("read", lambda rpc_client: rpc_client.get_balance(signer.pubkey())))).value
+        if sol_balance < int(amount * 1e9):
+            raise PreTradeError(f"Insufficient funds. Check your balance or settings.\n\n Required: {amount} SOL.")
+        return sol_balance
+
+    async def fetch_quote():
+        config = await config_task
+        signer = await check_wallet()
+
+        # Preset trades usually hit a quote prefetched while the card was on screen
+        return await _timed(timings, "quote", get_swap_quote(signer, config, coin_info['mint_address'], amount, is_sell, consume=True))
+
+    try:
+        signer, sol_balance, swap_response = await _run_fail_fast(check_wallet(), check_balance(), fetch_quote())
+        timings["pre_checks"] = round((time.perf_counter() - started) * 1000, 1)
 
         # Check user's SOL balance for purchases
         if not is_sell:
-            sol_balance = client.get_balance(sender_keypair.pubkey()).value
-
             # Extract relevant data from swap response
             amount_in = swap_response["rate"]["amountIn"]  # SOL required for the swap
             platform_fee = swap_response["rate"]["platformFee"]  # Additional fee in lamports
@@ -147,26 +254,46 @@ async def swap_coin_func(update, context, amount, coin_info, is_sell):
 
             if sol_balance < required_lamports:
                 required_sol = required_lamports / 1e9
-                return {'error': f"Insufficient funds. Check your balance or settings.\n\n Required: {required_sol} SOL."}
+                outcome = "rejected"
+                return {'error': f"Insufficient funds. Check your balance or settings.\n\n Required: {required_sol} SOL.", 'timings': timings}
 
         # Define custom options
         custom_options = {
             "send_options": {"skip_preflight": True, "max_retries": 5},
             "confirmation_retries": 50,
             "confirmation_retry_timeout": 1000,
-            "last_valid_block_height_buffer": 200,
+            "last_valid_block_height_buffer": 10,
             "commitment": "processed",
             "resend_interval": 1500,
             "confirmation_check_interval": 100,
             "skip_confirmation_check": True,
+            "confirmation_mode": SWAP_CONFIRMATION_MODE,
         }
 
-        txid = await solana_tracker.perform_swap(swap_response, options=custom_options)
-        
+        solana_tracker = SolanaTracker(signer, rpc_pool.pick("send"))
+        txid = await _timed(timings, "send", solana_tracker.perform_swap(swap_response, options=custom_options))
+        if isinstance(txid, Exception):
+            raise txid
+        outcome = "sent"
+
         return {
             'message': f"Transaction successful! Check your transaction here: "
-                        f"[solscan.io](https://solscan.io/tx/{txid})"
+                        f"[solscan.io](https://solscan.io/tx/{txid})",
+            'txid': txid,
+            'confirmation': solana_tracker.confirmation,
+            'timings': timings,
         }
 
+    except PreTradeError as e:
+        outcome = "rejected"
+        return {'error': str(e), 'timings': timings}
     except Exception as e:
-        return {'error': f"Error occurred: {str(e)}"}
\ No newline at end of file
+        return {'error': f"Error occurred: {str(e)}", 'timings': timings}
+    finally:
+        # Make sure nothing outlives a failed pre-check
+        for task in (config_task, signer_task):
+            if not task.done():
+                task.cancel()
+        if signer_task.done() and not signer_task.cancelled() and signer_task.exception() is None and signer_task.result():
+            signer_task.result().release()
+        _record_trade(timings, is_sell, outcome)
@@ -0,0 +1,188 @@
+import asyncio
+import os
+from dotenv import load_dotenv
+from solana.rpc.commitment import Confirmed
+
+from services.blockhash_service import blockhash_prefetcher
+from services.rpc_pool import rpc_pool
+from services.rpc_websocket import get_rpc_websocket, to_ws_url
+
+load_dotenv()
+
+# Defaults to the websocket of the healthiest read endpoint
+CONFIRMATION_WS_URL = os.getenv("CONFIRMATION_WS_URL")
+CONFIRMATION_POLL_INTERVAL = float(os.getenv("CONFIRMATION_POLL_INTERVAL", 1))
+CONFIRMATION_WS_CONNECT_TIMEOUT = float(os.getenv("CONFIRMATION_WS_CONNECT_TIMEOUT", 2))
+MAX_SIGNATURES_PER_CALL = 256  # getSignatureStatuses limit
+
+# Outcomes a tracked signature resolves to
+LANDED = "landed"
+FAILED = "failed"
+EXPIRED = "expired"
+
+COMMITMENT_LEVELS = {"processed": 0, "confirmed": 1, "finalized": 2}
+
+
+def _status_level(status):
+    # confirmation_status is a TransactionConfirmationStatus enum, e.g. "TransactionConfirmationStatus.Confirmed"
+    return COMMITMENT_LEVELS.get(str(status.confirmation_status).rsplit(".", 1)[-1].lower(), -1)
+
+
+class ConfirmationTracker:
+    """
+    Confirms every in-flight signature from one polling loop.
+
+    Signatures are checked in batches of up to 256 per getSignatureStatuses
+    call, so RPC load grows with the number of batches rather than the number
+    of concurrent trades. Each tracked signature gets a future that resolves
+    to (outcome, err) once it lands, fails or its blockhash expires.
+    """
+
+    def __init__(self, interval=CONFIRMATION_POLL_INTERVAL):
+        self.interval = interval
+        self._pending = {}  # signature -> (future, last_valid_block_height, required level)
+        self._task = None
+
+    def __len__(self):
+        return len(self._pending)
+
+    def track(self, signature, last_valid_block_height, commitment="confirmed"):
+        """
+        Starts tracking signature and returns a future resolving to (outcome, err).
+        """
+        entry = self._pending.get(signature)
+        if entry is not None:
+            return entry[0]
+
+        future = asyncio.get_running_loop().create_future()
+        self._pending[signature] = (future, last_valid_block_height, COMMITMENT_LEVELS[commitment])
+
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+        return future
+
+    def _resolve(self, signature, outcome, err=None):
+        future, _, _ = self._pending.pop(signature)
+        if not future.done():
+            future.set_result((outcome, err))
+
+    async def _poll(self):
+        signatures = list(self._pending)
+        batches = [signatures[i:i + MAX_SIGNATURES_PER_CALL] for i in range(0, len(signatures), MAX_SIGNATURES_PER_CALL)]
+        responses = await asyncio.gather(*(
+            rpc_pool.run("read", lambda rpc_client, batch=batch: rpc_client.get_signature_statuses(batch), Confirmed)
+            for batch in batches
+        ))
+
+        for batch, response in zip(batches, responses):
+            for signature, status in zip(batch, response.value):
+                if status is None or signature not in self._pending:
+                    continue
+                if status.err:
+                    self._resolve(signature, FAILED, status.err)
+                elif _status_level(status) >= self._pending[signature][2]:
+                    self._resolve(signature, LANDED)
+
+        if not self._pending:
+            return
+
+        height = await current_block_height()
+        for signature, (_, last_valid_block_height, _) in list(self._pending.items()):
+            if height > last_valid_block_height:
+                self._resolve(signature, EXPIRED)
+
+    async def _run(self):
+        # Runs only while there is something to confirm
+        while self._pending:
+            await asyncio.sleep(self.interval)
+            try:
+                await self._poll()
+            except Exception as e:
+                print(f"Error polling signature statuses: {e}")
+
+    async def stop(self, _application=None):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        for future, _, _ in self._pending.values():
+            future.cancel()
+        self._pending.clear()
+
+
+class WebsocketConfirmationTracker:
+    """
+    Confirms signatures with signatureSubscribe over the shared RPC websocket.
+
+    Notifications are pushed as soon as the signature reaches the requested
+    commitment. If the socket can't connect or drops while a signature is
+    pending, that signature is handed to the polling tracker instead.
+    """
+
+    def __init__(self, ws_url, fallback, connect_timeout=CONFIRMATION_WS_CONNECT_TIMEOUT):
+        self.ws_url = ws_url
+        self.fallback = fallback
+        self.connect_timeout = connect_timeout
+
+    def track(self, signature, last_valid_block_height, commitment="confirmed"):
+        """
+        Starts tracking signature and returns a future resolving to (outcome, err).
+        """
+        future = asyncio.get_running_loop().create_future()
+        task = asyncio.create_task(self._watch(signature, last_valid_block_height, commitment, future))
+        future.add_done_callback(lambda f: task.cancel() if f.cancelled() else None)
+        return future
+
+    async def _watch(self, signature, last_valid_block_height, commitment, future):
+        websocket = get_rpc_websocket(self.ws_url or to_ws_url(rpc_pool.pick("read")))
+        notified = asyncio.get_running_loop().create_future()
+
+        def on_notification(result):
+            if not notified.done():
+                notified.set_result(result["value"]["err"])
+
+        def on_disconnect():
+            if not notified.done():
+                notified.set_exception(ConnectionError("RPC websocket disconnected"))
+
+        key = None
+        websocket.add_disconnect_callback(on_disconnect)
+        try:
+            await websocket.wait_connected(self.connect_timeout)
+            key = await websocket.subscribe("signatureSubscribe", [str(signature), {"commitment": commitment}], on_notification)
+
+            # Wait for the push, checking for blockhash expiry in between
+            while not notified.done():
+                await asyncio.wait({notified}, timeout=self.fallback.interval)
+                if not notified.done() and await current_block_height() > last_valid_block_height:
+                    future.set_result((EXPIRED, None))
+                    return
+
+            err = notified.result()
+            future.set_result((FAILED, err) if err else (LANDED, None))
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            print(f"Websocket confirmation unavailable, polling instead: {e}")
+            result = await self.fallback.track(signature, last_valid_block_height, commitment)
+            if not future.done():
+                future.set_result(result)
+        finally:
+            websocket.remove_disconnect_callback(on_disconnect)
+            if key is not None:
+                await websocket.unsubscribe(key, on_notification)
+
+
+async def current_block_height():
+    # The blockhash prefetcher already tracks the height, fall back to RPC if it isn't running
+    height = blockhash_prefetcher.estimated_block_height()
+    if height is None:
+        height = (await rpc_pool.run("read", lambda rpc_client: rpc_client.get_block_height(Confirmed), Confirmed)).value
+    return height
+
+
+confirmation_tracker = ConfirmationTracker()
+websocket_confirmation_tracker = WebsocketConfirmationTracker(CONFIRMATION_WS_URL, confirmation_tracker)
@@ -0,0 +1,144 @@
+import asyncio
+import json
+import os
+from collections import OrderedDict
+from dotenv import load_dotenv
+from telegram.error import BadRequest
+
+load_dotenv()
+
+# JSON file the cache survives restarts in, empty keeps it in memory only
+FILE_ID_CACHE_PATH = os.getenv("FILE_ID_CACHE_PATH", "file_ids.json")
+FILE_ID_CACHE_SIZE = int(os.getenv("FILE_ID_CACHE_SIZE", 10000))
+# Writes are batched, new file_ids reach disk at most this many seconds late
+FILE_ID_CACHE_FLUSH_DELAY = float(os.getenv("FILE_ID_CACHE_FLUSH_DELAY", 5))
+
+# BadRequest descriptions that mean the file_id itself is no longer usable
+FILE_ID_ERRORS = (
+    "wrong file identifier",
+    "wrong remote file identifier",
+    "wrong file_id",
+    "file reference expired",
+    "file_reference_expired",
+)
+
+
+class FileIdCache:
+    """
+    Maps a photo's source (its URL, or any key for generated images) to the
+    Telegram file_id it got on its first upload.
+
+    Sending a file_id skips Telegram fetching the URL from its origin again,
+    which for IPFS-hosted token art can take seconds. A file_id Telegram
+    rejects is evicted and the photo is sent from its source again. file_ids
+    are only valid for the bot that uploaded them, so keys include the bot id.
+    """
+
+    def __init__(self, path=FILE_ID_CACHE_PATH, maxsize=FILE_ID_CACHE_SIZE, flush_delay=FILE_ID_CACHE_FLUSH_DELAY):
+        self.path = path
+        self.maxsize = maxsize
+        self.flush_delay = flush_delay
+        self._file_ids = OrderedDict()  # "bot id:key" -> file_id, least recently used first
+        self._evicted = set()  # Keys to drop from the file on the next write
+        self._flush_task = None
+        self.hits = 0
+        self.misses = 0
+
+    def _read(self):
+        try:
+            with open(self.path) as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return {}
+        except ValueError as e:
+            print(f"Ignoring unreadable file_id cache {self.path}: {e}")
+            return {}
+
+    def _write(self, file_ids, evicted):
+        # Merge with what other workers wrote, then replace the file atomically
+        merged = {key: file_id for key, file_id in self._read().items() if key not in evicted}
+        merged.update(file_ids)
+        if len(merged) > self.maxsize:
+            merged = dict(list(merged.items())[-self.maxsize:])
+        tmp_path = f"{self.path}.{os.getpid()}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(merged, f)
+        os.replace(tmp_path, self.path)
+
+    async def start(self, _application=None):
+        if self.path:
+            self._file_ids.update(await asyncio.to_thread(self._read))
+
+    async def stop(self, _application=None):
+        if self._flush_task is not None:
+            self._flush_task.cancel()
+            self._flush_task = None
+            await self.flush()
+
+    async def flush(self):
+        if self.path:
+            evicted, self._evicted = self._evicted, set()
+            try:
+                await asyncio.to_thread(self._write, dict(self._file_ids), evicted)
+            except OSError as e:
+                print(f"Error saving file_id cache to {self.path}: {e}")
+
+    async def _flush_later(self):
+        await asyncio.sleep(self.flush_delay)
+        self._flush_task = None
+        await self.flush()
+
+    def get(self, bot, key):
+        file_id = self._file_ids.get(f"{bot.id}:{key}")
+        if file_id is not None:
+            self._file_ids.move_to_end(f"{bot.id}:{key}")
+        return file_id
+
+    def set(self, bot, key, file_id):
+        self._file_ids[f"{bot.id}:{key}"] = file_id
+        self._file_ids.move_to_end(f"{bot.id}:{key}")
+        while len(self._file_ids) > self.maxsize:
+            self._file_ids.popitem(last=False)
+        self._flush_soon()
+
+    def evict(self, bot, key):
+        self._file_ids.pop(f"{bot.id}:{key}", None)
+        self._evicted.add(f"{bot.id}:{key}")
+        self._flush_soon()
+
+    def _flush_soon(self):
+        if self.path and self._flush_task is None:
+            self._flush_task = asyncio.ensure_future(self._flush_later())
+
+    async def send_photo(self, bot, photo, key=None, **kwargs):
+        """
+        bot.send_photo() that sends the cached file_id for key (photo itself if
+        it's a URL) when there is one, and caches the file_id of a fresh upload.
+        photo may be a coroutine function returning the photo, so generated
+        images are only built when there is no file_id to send.
+        """
+        key = key or photo
+        file_id = self.get(bot, key)
+        if file_id is not None:
+            try:
+                message = await bot.send_photo(photo=file_id, **kwargs)
+                self.hits += 1
+                return message
+            except BadRequest as e:
+                # Anything else, e.g. a bad caption, would fail the upload too
+                if not any(marker in str(e).lower() for marker in FILE_ID_ERRORS):
+                    raise
+                print(f"Cached file_id for {key} stopped working, uploading again: {e}")
+                self.evict(bot, key)
+
+        self.misses += 1
+        if callable(photo):
+            photo = await photo()
+        message = await bot.send_photo(photo=photo, **kwargs)
+        if message.photo:
+            # The largest size is the original upload
+            self.set(bot, key, message.photo[-1].file_id)
+        return message
+
+
+file_id_cache = FileIdCache()
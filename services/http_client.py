@@ -0,0 +1,91 @@
+import os
+from urllib.parse import urlsplit
+
+import httpx
+from dotenv import load_dotenv
+from solana.rpc.async_api import AsyncClient
+
+load_dotenv()
+
+# Pool sizing (per upstream host)
+HTTP_MAX_CONNECTIONS_PER_HOST = int(os.getenv("HTTP_MAX_CONNECTIONS_PER_HOST", 50))
+HTTP_MAX_KEEPALIVE_PER_HOST = int(os.getenv("HTTP_MAX_KEEPALIVE_PER_HOST", 20))
+HTTP_KEEPALIVE_EXPIRY = float(os.getenv("HTTP_KEEPALIVE_EXPIRY", 60))
+HTTP_TIMEOUT = float(os.getenv("HTTP_TIMEOUT", 10))
+
+try:
+    import h2  # noqa: F401
+    HTTP2_AVAILABLE = True
+except ImportError:
+    HTTP2_AVAILABLE = False
+
+# One pooled client per upstream host, and one RPC client per (endpoint, commitment)
+# sending through the pooled client of its host
+_http_clients = {}
+_rpc_clients = {}
+
+
+def _new_http_client():
+    return httpx.AsyncClient(
+        http2=HTTP2_AVAILABLE,
+        timeout=HTTP_TIMEOUT,
+        limits=httpx.Limits(
+            max_connections=HTTP_MAX_CONNECTIONS_PER_HOST,
+            max_keepalive_connections=HTTP_MAX_KEEPALIVE_PER_HOST,
+            keepalive_expiry=HTTP_KEEPALIVE_EXPIRY,
+        ),
+    )
+
+
+def get_http_client(url):
+    """
+    Returns the shared keep-alive HTTP client for the host of the given URL.
+    """
+    host = urlsplit(url).netloc
+    http = _http_clients.get(host)
+    if http is None or http.is_closed:
+        http = _http_clients[host] = _new_http_client()
+    return http
+
+
+class PooledAsyncClient(AsyncClient):
+    """
+    Solana AsyncClient that sends its requests through the given httpx client
+    instead of opening a connection pool of its own.
+
+    close() leaves the shared client open, it belongs to whoever passed it in.
+    """
+
+    def __init__(self, endpoint, http, commitment=None):
+        super().__init__(endpoint, commitment=commitment, timeout=HTTP_TIMEOUT)
+        # Replaces the provider's own session before it ever opened a connection
+        self._provider.session = self.http = http
+
+    async def close(self):
+        pass
+
+
+def get_rpc_client(url, commitment=None):
+    """
+    Returns the shared Solana AsyncClient for the given RPC endpoint and commitment.
+    Every commitment of an endpoint, and every endpoint on the same host, share
+    the host's pooled HTTP client.
+    """
+    key = (url, str(commitment))
+    rpc_client = _rpc_clients.get(key)
+    if rpc_client is None or rpc_client.http.is_closed:
+        rpc_client = _rpc_clients[key] = PooledAsyncClient(url, get_http_client(url), commitment)
+    return rpc_client
+
+
+async def close_clients(_application=None):
+    """
+    Closes every pooled client. Registered as the Application post_shutdown hook.
+    """
+    http_clients = list(_http_clients.values())
+    _http_clients.clear()
+    # RPC clients only hold a pooled client, closing those is enough
+    _rpc_clients.clear()
+
+    for http in http_clients:
+        await http.aclose()
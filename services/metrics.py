@@ -0,0 +1,108 @@
+import os
+import time
+from contextlib import contextmanager
+from urllib.parse import urlsplit
+
+from dotenv import load_dotenv
+from prometheus_client import Counter, Gauge, Histogram, start_http_server
+
+load_dotenv()
+
+# The scrape endpoint is only served when METRICS_PORT is set
+METRICS_PORT = os.getenv("METRICS_PORT")
+METRICS_ADDR = os.getenv("METRICS_ADDR", "127.0.0.1")
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+
+TRADE_STAGE_SECONDS = Histogram(
+    "trade_stage_seconds",
+    "Time spent in each stage of a trade, from the Confirm press to the send",
+    ["stage", "side", "outcome"],
+    buckets=LATENCY_BUCKETS,
+)
+TRADES_TOTAL = Counter(
+    "trades_total",
+    "Trades by side and outcome",
+    ["side", "outcome"],
+)
+TRADE_CONFIRMATION_SECONDS = Histogram(
+    "trade_confirmation_seconds",
+    "Time from sending a trade until it landed, failed or expired",
+    ["side", "outcome"],
+    buckets=LATENCY_BUCKETS,
+)
+RPC_REQUEST_SECONDS = Histogram(
+    "rpc_request_seconds",
+    "Solana RPC call latency",
+    ["kind", "endpoint", "outcome"],
+    buckets=LATENCY_BUCKETS,
+)
+UPSTREAM_REQUEST_SECONDS = Histogram(
+    "upstream_request_seconds",
+    "HTTP API call latency (token info, wallet, swap quotes)",
+    ["upstream", "outcome"],
+    buckets=LATENCY_BUCKETS,
+)
+UPDATE_QUEUE_DEPTH = Gauge(
+    "update_queue_depth",
+    "Updates received but not yet picked up by the Application",
+)
+UPDATES_WAITING = Gauge(
+    "updates_waiting",
+    "Updates waiting on an earlier update from the same user or chat, or on a free processing slot",
+)
+UPDATES_IN_PROGRESS = Gauge(
+    "updates_in_progress",
+    "Updates being handled right now",
+)
+UPDATE_WAIT_SECONDS = Histogram(
+    "update_wait_seconds",
+    "Time an update waited before its handlers started",
+    buckets=LATENCY_BUCKETS,
+)
+WORKER_UPDATES_DISPATCHED = Counter(
+    "worker_updates_dispatched",
+    "Updates the supervisor routed to each worker process",
+    ["worker"],
+)
+WORKER_UPDATES_PENDING = Gauge(
+    "worker_updates_pending",
+    "Updates routed to a worker and not finished yet, as of its last load report",
+    ["worker"],
+)
+WORKER_RESTARTS = Counter(
+    "worker_restarts",
+    "Worker processes restarted by the supervisor",
+    ["worker", "reason"],
+)
+
+
+def endpoint_label(url):
+    """
+    Reduces an endpoint URL to its host so API keys in paths or queries never become labels.
+    """
+    return urlsplit(url).netloc or url
+
+
+@contextmanager
+def observe(histogram, **labels):
+    """
+    Times the block into histogram, labelling it outcome="ok" or outcome="error".
+    """
+    started = time.perf_counter()
+    outcome = "ok"
+    try:
+        yield
+    except BaseException:
+        outcome = "error"
+        raise
+    finally:
+        histogram.labels(outcome=outcome, **labels).observe(time.perf_counter() - started)
+
+
+def start_metrics_server(_application=None):
+    """
+    Serves /metrics from a background thread when METRICS_PORT is configured.
+    """
+    if METRICS_PORT:
+        start_http_server(int(METRICS_PORT), addr=METRICS_ADDR)
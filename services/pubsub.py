@@ -0,0 +1,95 @@
+import asyncio
+import os
+import uuid
+from collections import defaultdict
+from dotenv import load_dotenv
+
+from services.supabase_client import get_supabase
+
+load_dotenv()
+
+# "memory" keeps messages inside this process, "supabase" fans them out to every replica
+PUBSUB_BACKEND = os.getenv("PUBSUB_BACKEND", "memory")
+
+# Identifies this process so subscribers can skip their own messages
+PROCESS_ID = uuid.uuid4().hex
+
+
+async def _deliver(callbacks, message):
+    for callback in callbacks:
+        try:
+            result = callback(message)
+            if asyncio.iscoroutine(result):
+                await result
+        except Exception as e:
+            print(f"Error handling pub/sub message: {e}")
+
+
+class InMemoryPubSub:
+    """
+    Process-local pub/sub. Stand-in for a shared broker in single-replica setups.
+    """
+
+    def __init__(self):
+        self._subscribers = defaultdict(list)
+
+    async def start(self):
+        pass
+
+    async def stop(self):
+        self._subscribers.clear()
+
+    async def subscribe(self, channel, callback):
+        self._subscribers[channel].append(callback)
+
+    async def publish(self, channel, message):
+        await _deliver(list(self._subscribers[channel]), message)
+
+
+class SupabaseBroadcastPubSub:
+    """
+    Pub/sub over Supabase realtime broadcast, shared by every bot replica.
+    """
+
+    def __init__(self):
+        self._channels = {}
+        self._subscribers = defaultdict(list)
+
+    async def start(self):
+        supabase = await get_supabase()
+        if not supabase.realtime.is_connected:
+            await supabase.realtime.connect()
+
+    async def stop(self):
+        for channel in self._channels.values():
+            await channel.unsubscribe()
+        self._channels.clear()
+        self._subscribers.clear()
+
+    async def _channel(self, name):
+        channel = self._channels.get(name)
+        if channel is None:
+            supabase = await get_supabase()
+            channel = supabase.channel(name)
+            channel.on_broadcast("message", lambda event: self._on_broadcast(name, event))
+            await channel.subscribe()
+            self._channels[name] = channel
+        return channel
+
+    def _on_broadcast(self, name, event):
+        asyncio.ensure_future(_deliver(list(self._subscribers[name]), event["payload"]))
+
+    async def subscribe(self, channel, callback):
+        self._subscribers[channel].append(callback)
+        await self._channel(channel)
+
+    async def publish(self, channel, message):
+        # Broadcasts are not echoed back to the sender, so deliver locally as well
+        await _deliver(list(self._subscribers[channel]), message)
+        await (await self._channel(channel)).send_broadcast("message", message)
+
+
+if PUBSUB_BACKEND == "supabase":
+    pubsub = SupabaseBroadcastPubSub()
+else:
+    pubsub = InMemoryPubSub()
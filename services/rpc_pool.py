@@ -0,0 +1,203 @@
+import asyncio
+import os
+import time
+from collections import deque
+from dotenv import load_dotenv
+
+from services.http_client import get_rpc_client
+from services.metrics import RPC_REQUEST_SECONDS, endpoint_label
+
+load_dotenv()
+
+
+def _urls(value):
+    return [url.strip() for url in value.split(",") if url.strip()]
+
+
+# Endpoints used for reads (balances, token accounts, blockhashes, statuses)
+SOLANA_RPC_URLS = _urls(os.getenv("SOLANA_RPC_URLS", ",".join(filter(None, [
+    os.getenv("SOLANA_RPC_URL"),
+    "https://api.mainnet-beta.solana.com",
+]))))
+# Endpoints signed transactions are sent (and fanned out) to
+SEND_RPC_URLS = _urls(os.getenv("SEND_RPC_URLS", "https://rpc.solanatracker.io/public?advancedTx=true"))
+
+RPC_PROBE_INTERVAL = float(os.getenv("RPC_PROBE_INTERVAL", 5))
+RPC_EJECT_AFTER_FAILURES = int(os.getenv("RPC_EJECT_AFTER_FAILURES", 3))
+RPC_EJECT_SECONDS = float(os.getenv("RPC_EJECT_SECONDS", 30))
+RPC_MAX_SLOT_LAG = int(os.getenv("RPC_MAX_SLOT_LAG", 50))
+RPC_SLOT_LAG_PENALTY_MS = 20  # Score penalty per slot an endpoint is behind the best one
+LATENCY_ALPHA = 0.2  # Weight of the newest sample in the latency moving average
+ERROR_WINDOW = 50  # Number of recent calls the error rate is computed over
+
+
+class Endpoint:
+    """
+    Rolling health stats for one RPC endpoint.
+    """
+
+    def __init__(self, url):
+        self.url = url
+        self.latency_ms = None
+        self.results = deque(maxlen=ERROR_WINDOW)  # True for success, False for error
+        self.consecutive_failures = 0
+        self.slot = None
+        self.slot_lag = 0
+        self.ejected_until = 0
+
+    @property
+    def error_rate(self):
+        return self.results.count(False) / len(self.results) if self.results else 0.0
+
+    @property
+    def ejected(self):
+        return self.ejected_until > time.monotonic()
+
+    def score(self):
+        """
+        Lower is better. Endpoints without samples score 0 so they get measured.
+        """
+        latency = self.latency_ms or 0
+        return latency * (1 + 4 * self.error_rate) + self.slot_lag * RPC_SLOT_LAG_PENALTY_MS
+
+    def record(self, latency_ms, ok):
+        self.results.append(ok)
+        if ok:
+            self.consecutive_failures = 0
+            if self.latency_ms is None:
+                self.latency_ms = latency_ms
+            else:
+                self.latency_ms += LATENCY_ALPHA * (latency_ms - self.latency_ms)
+        else:
+            self.consecutive_failures += 1
+            if self.consecutive_failures >= RPC_EJECT_AFTER_FAILURES:
+                self.eject(f"{self.consecutive_failures} consecutive failures")
+
+    def eject(self, reason):
+        if not self.ejected:
+            print(f"Ejecting RPC endpoint {self.url}: {reason}")
+        self.ejected_until = time.monotonic() + RPC_EJECT_SECONDS
+
+
+class RpcPool:
+    """
+    Routes each kind of RPC call to the healthiest endpoint configured for it.
+
+    Endpoints are scored on rolling latency, error rate and slot lag. Failing
+    or lagging endpoints are ejected for a while and re-probed in the
+    background before they take traffic again.
+    """
+
+    def __init__(self, urls_by_kind, probe_interval=RPC_PROBE_INTERVAL):
+        self.urls_by_kind = urls_by_kind
+        self.probe_interval = probe_interval
+        self.endpoints = {url: Endpoint(url) for urls in urls_by_kind.values() for url in urls}
+        self._task = None
+
+    def ranked(self, kind):
+        """
+        Returns the URLs for kind, healthiest first. Ejected endpoints are left
+        out unless every endpoint for kind is ejected.
+        """
+        endpoints = [self.endpoints[url] for url in self.urls_by_kind[kind]]
+        healthy = [endpoint for endpoint in endpoints if not endpoint.ejected] or endpoints
+        return [endpoint.url for endpoint in sorted(healthy, key=Endpoint.score)]
+
+    def pick(self, kind):
+        return self.ranked(kind)[0]
+
+    def record(self, url, latency_ms, ok, kind="read"):
+        RPC_REQUEST_SECONDS.labels(
+            kind=kind, endpoint=endpoint_label(url), outcome="ok" if ok else "error",
+        ).observe(latency_ms / 1000)
+        endpoint = self.endpoints.get(url)
+        if endpoint is not None:
+            endpoint.record(latency_ms, ok)
+
+    async def run(self, kind, request, commitment=None):
+        """
+        Calls request(rpc_client) against the best endpoint for kind, failing
+        over to the next best endpoint once if it raises.
+        """
+        urls = self.ranked(kind)[:2]
+        for i, url in enumerate(urls):
+            started = time.perf_counter()
+            try:
+                result = await request(get_rpc_client(url, commitment))
+            except Exception:
+                self.record(url, (time.perf_counter() - started) * 1000, False, kind)
+                if i == len(urls) - 1:
+                    raise
+                continue
+            self.record(url, (time.perf_counter() - started) * 1000, True, kind)
+            return result
+
+    async def _probe(self, endpoint):
+        started = time.perf_counter()
+        try:
+            endpoint.slot = (await get_rpc_client(endpoint.url).get_slot()).value
+        except Exception:
+            endpoint.slot = None
+            self.record(endpoint.url, (time.perf_counter() - started) * 1000, False, "probe")
+            return
+        self.record(endpoint.url, (time.perf_counter() - started) * 1000, True, "probe")
+
+    async def probe(self):
+        """
+        Measures every endpoint with getSlot and updates slot lag. Ejected
+        endpoints are probed too, so one that keeps failing or lagging stays
+        ejected and one that recovered takes traffic once its ejection ends.
+        """
+        endpoints = list(self.endpoints.values())
+        await asyncio.gather(*(self._probe(endpoint) for endpoint in endpoints))
+
+        slots = [endpoint.slot for endpoint in endpoints if endpoint.slot is not None]
+        best_slot = max(slots) if slots else None
+        for endpoint in endpoints:
+            if endpoint.slot is None or best_slot is None:
+                continue
+            endpoint.slot_lag = best_slot - endpoint.slot
+            if endpoint.slot_lag > RPC_MAX_SLOT_LAG:
+                endpoint.eject(f"{endpoint.slot_lag} slots behind")
+
+    def scoreboard(self):
+        """
+        Returns the current health stats of every endpoint, best first.
+        """
+        return [
+            {
+                "url": endpoint.url,
+                "kinds": [kind for kind, urls in self.urls_by_kind.items() if endpoint.url in urls],
+                "score": round(endpoint.score(), 1),
+                "latency_ms": None if endpoint.latency_ms is None else round(endpoint.latency_ms, 1),
+                "error_rate": round(endpoint.error_rate, 3),
+                "slot": endpoint.slot,
+                "slot_lag": endpoint.slot_lag,
+                "ejected": endpoint.ejected,
+            }
+            for endpoint in sorted(self.endpoints.values(), key=Endpoint.score)
+        ]
+
+    async def _run(self):
+        while True:
+            try:
+                await self.probe()
+            except Exception as e:
+                print(f"Error probing RPC endpoints: {e}")
+            await asyncio.sleep(self.probe_interval)
+
+    async def start(self, _application=None):
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self, _application=None):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+
+rpc_pool = RpcPool({"read": SOLANA_RPC_URLS, "send": SEND_RPC_URLS})
@@ -0,0 +1,251 @@
+import asyncio
+import itertools
+import json
+import os
+
+import aiohttp
+from dotenv import load_dotenv
+
+load_dotenv()
+
+WS_REQUEST_TIMEOUT = float(os.getenv("WS_REQUEST_TIMEOUT", 10))
+WS_HEARTBEAT = float(os.getenv("WS_HEARTBEAT", 20))
+WS_RECONNECT_DELAY = 0.5
+WS_MAX_RECONNECT_DELAY = 30
+
+
+def to_ws_url(http_url):
+    """
+    Derives the websocket URL of an RPC endpoint from its HTTP URL.
+    """
+    if http_url.startswith("https://"):
+        return "wss://" + http_url[len("https://"):]
+    if http_url.startswith("http://"):
+        return "ws://" + http_url[len("http://"):]
+    return http_url
+
+
+class RpcWebsocket:
+    """
+    One persistent Solana JSON-RPC websocket, shared by every subscriber.
+
+    Identical subscriptions (same method and params) are reference counted and
+    opened once. The socket reconnects with backoff and re-opens every live
+    subscription; disconnect callbacks let callers fall back while it is down.
+    """
+
+    def __init__(self, url):
+        self.url = url
+        self._session = None
+        self._ws = None
+        self._task = None
+        self._ids = itertools.count(1)
+        self._requests = {}  # request id -> (future, subscription key or None)
+        self._subscriptions = {}  # (method, params json) -> subscription dict
+        self._by_sub_id = {}  # server subscription id -> subscription key
+        self._connected = asyncio.Event()
+        self._disconnect_callbacks = []
+
+    @property
+    def connected(self):
+        return self._ws is not None and not self._ws.closed
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def wait_connected(self, timeout):
+        await asyncio.wait_for(self._connected.wait(), timeout)
+
+    def add_disconnect_callback(self, callback):
+        self._disconnect_callbacks.append(callback)
+
+    def remove_disconnect_callback(self, callback):
+        if callback in self._disconnect_callbacks:
+            self._disconnect_callbacks.remove(callback)
+
+    async def _run(self):
+        delay = WS_RECONNECT_DELAY
+        while True:
+            try:
+                if self._session is None:
+                    self._session = aiohttp.ClientSession()
+                async with self._session.ws_connect(self.url, heartbeat=WS_HEARTBEAT) as ws:
+                    self._ws = ws
+                    self._connected.set()
+                    delay = WS_RECONNECT_DELAY
+                    resubscribe = asyncio.create_task(self._resubscribe())
+                    try:
+                        async for msg in ws:
+                            if msg.type == aiohttp.WSMsgType.TEXT:
+                                self._dispatch(json.loads(msg.data))
+                            elif msg.type in (aiohttp.WSMsgType.CLOSED, aiohttp.WSMsgType.ERROR):
+                                break
+                    finally:
+                        resubscribe.cancel()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f"RPC websocket {self.url} error: {e}")
+            finally:
+                self._on_disconnect()
+
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, WS_MAX_RECONNECT_DELAY)
+
+    def _on_disconnect(self):
+        self._ws = None
+        self._connected.clear()
+        for future, _ in self._requests.values():
+            if not future.done():
+                future.set_exception(ConnectionError("RPC websocket disconnected"))
+        self._requests.clear()
+        self._by_sub_id.clear()
+        for subscription in self._subscriptions.values():
+            subscription["sub_id"] = None
+        for callback in list(self._disconnect_callbacks):
+            callback()
+
+    def _dispatch(self, message):
+        if "id" in message:
+            future, key = self._requests.pop(message["id"], (None, None))
+            if future is None or future.done():
+                return
+            if "error" in message:
+                future.set_exception(RuntimeError(message["error"].get("message", message["error"])))
+                return
+            # Map the subscription before any notification for it is dispatched
+            if key is not None and key in self._subscriptions:
+                self._subscriptions[key]["sub_id"] = message["result"]
+                self._by_sub_id[message["result"]] = key
+            future.set_result(message["result"])
+            return
+
+        method = message.get("method", "")
+        if not method.endswith("Notification"):
+            return
+        params = message["params"]
+        key = self._by_sub_id.get(params["subscription"])
+        subscription = self._subscriptions.get(key)
+        if subscription is None:
+            return
+
+        # signatureSubscribe is one-shot, the server drops it after notifying
+        if method == "signatureNotification":
+            self._by_sub_id.pop(params["subscription"], None)
+            self._subscriptions.pop(key, None)
+
+        for callback in list(subscription["callbacks"]):
+            try:
+                callback(params["result"])
+            except Exception as e:
+                print(f"Error handling {method}: {e}")
+
+    async def _request(self, method, params, key=None):
+        if not self.connected:
+            raise ConnectionError("RPC websocket is not connected")
+        request_id = next(self._ids)
+        future = asyncio.get_running_loop().create_future()
+        self._requests[request_id] = (future, key)
+        try:
+            await self._ws.send_str(json.dumps({"jsonrpc": "2.0", "id": request_id, "method": method, "params": params}))
+            return await asyncio.wait_for(future, WS_REQUEST_TIMEOUT)
+        finally:
+            self._requests.pop(request_id, None)
+
+    async def _open(self, key, subscription):
+        opening = subscription["opening"]
+        if opening is None:
+            opening = subscription["opening"] = asyncio.ensure_future(self._request(subscription["method"], subscription["params"], key))
+        try:
+            await asyncio.shield(opening)
+        finally:
+            # Callers sharing this request all get here, only clear it once and only if no newer one started
+            if opening.done() and subscription["opening"] is opening:
+                subscription["opening"] = None
+
+    async def _resubscribe(self):
+        for key, subscription in list(self._subscriptions.items()):
+            try:
+                await self._open(key, subscription)
+            except Exception as e:
+                print(f"Error resubscribing {subscription['method']}: {e}")
+
+    async def subscribe(self, method, params, callback):
+        """
+        Adds callback to the (method, params) subscription, opening it if needed.
+        Returns the subscription key to pass to unsubscribe().
+        """
+        key = (method, json.dumps(params, sort_keys=True))
+        subscription = self._subscriptions.get(key)
+        if subscription is None:
+            subscription = self._subscriptions[key] = {
+                "method": method,
+                "params": params,
+                "callbacks": [],
+                "sub_id": None,
+                "opening": None,
+            }
+        subscription["callbacks"].append(callback)
+
+        if subscription["sub_id"] is None:
+            try:
+                await self._open(key, subscription)
+            except Exception:
+                await self.unsubscribe(key, callback)
+                raise
+        return key
+
+    async def unsubscribe(self, key, callback):
+        """
+        Drops callback and closes the subscription once nobody references it.
+        """
+        subscription = self._subscriptions.get(key)
+        if subscription is None:
+            return
+        if callback in subscription["callbacks"]:
+            subscription["callbacks"].remove(callback)
+        if subscription["callbacks"]:
+            return
+
+        del self._subscriptions[key]
+        sub_id = subscription["sub_id"]
+        if sub_id is not None:
+            self._by_sub_id.pop(sub_id, None)
+            try:
+                await self._request(subscription["method"].replace("Subscribe", "Unsubscribe"), [sub_id])
+            except Exception:
+                pass
+
+    async def close(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
+
+
+_websockets = {}
+
+
+def get_rpc_websocket(url):
+    """
+    Returns the shared websocket for the given endpoint, connecting it on first use.
+    """
+    websocket = _websockets.get(url)
+    if websocket is None:
+        websocket = _websockets[url] = RpcWebsocket(url)
+        websocket.start()
+    return websocket
+
+
+async def close_websockets(_application=None):
+    websockets = list(_websockets.values())
+    _websockets.clear()
+    for websocket in websockets:
+        await websocket.close()
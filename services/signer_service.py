@@ -0,0 +1,137 @@
+import base64
+import contextlib
+import os
+from dotenv import load_dotenv
+from solders.keypair import Keypair
+from solders.pubkey import Pubkey
+
+from services.cache import AsyncTTLCache
+from services.supabase_client import get_supabase
+
+load_dotenv()
+
+SIGNER_CACHE_SIZE = int(os.getenv("SIGNER_CACHE_SIZE", 1024))
+SIGNER_CACHE_TTL = float(os.getenv("SIGNER_CACHE_TTL", 900))
+
+
+class Signer:
+    """
+    Sign-only handle on a user's wallet key.
+
+    The 32-byte seed lives in a mutable buffer that is zeroed once the signer
+    has left the cache and the last lease on it is released. Keypairs are
+    derived per signature and never stored, so callers can sign but never read
+    the secret back out.
+    """
+
+    __slots__ = ("_pubkey", "_seed", "_leases", "_retired")
+
+    def __init__(self, pubkey: Pubkey, seed: bytearray):
+        self._pubkey = pubkey
+        self._seed = seed
+        self._leases = 0
+        self._retired = False
+
+    def pubkey(self) -> Pubkey:
+        return self._pubkey
+
+    def _keypair(self) -> Keypair:
+        keypair = Keypair.from_seed(bytes(self._seed))
+        if keypair.pubkey() != self._pubkey:
+            raise RuntimeError("Signer is no longer available. Please try again.")
+        return keypair
+
+    def sign_transaction(self, txn, recent_blockhash):
+        """
+        Signs a legacy or versioned transaction in place with this wallet.
+        """
+        txn.sign([self._keypair()], recent_blockhash)
+
+    def sign_message(self, message: bytes):
+        return self._keypair().sign_message(message)
+
+    def lease(self):
+        """
+        Keeps the seed from being zeroed until release(). Returns False if it already was.
+        """
+        if self._retired and self._leases == 0:
+            return False
+        self._leases += 1
+        return True
+
+    def release(self):
+        self._leases -= 1
+        if self._retired and self._leases == 0:
+            self.zeroize()
+
+    def retire(self):
+        """
+        Zeroes the seed now, or once the last lease is released if the signer is in use.
+        """
+        self._retired = True
+        if self._leases == 0:
+            self.zeroize()
+
+    def zeroize(self):
+        for i in range(len(self._seed)):
+            self._seed[i] = 0
+
+
+def _retire(_user_id, signer):
+    signer.retire()
+
+
+signer_cache = AsyncTTLCache(maxsize=SIGNER_CACHE_SIZE, ttl=SIGNER_CACHE_TTL, on_evict=_retire)
+
+
+async def _load_signer(user_id):
+    supabase = await get_supabase()
+    result = await supabase.table("Wallets").select("public_key, private_key").eq("user_id", user_id).execute()
+    if not result.data or not result.data[0]["private_key"]:
+        raise LookupError("No wallet found for the user.")
+
+    wallet = result.data[0]
+    pubkey = Pubkey.from_string(wallet["public_key"])
+    seed = bytearray(base64.b64decode(wallet["private_key"]))
+    signer = Signer(pubkey, seed)
+
+    # Fail at load time rather than at signing time if the stored key is corrupt
+    signer._keypair()
+    return signer
+
+
+async def get_signer(user_id):
+    """
+    Returns the cached Signer for the user's wallet, or None if the user has no wallet.
+    Lease it (acquire_signer, lease_signer) to sign with it after further awaits.
+    """
+    signer_cache.expire()
+    try:
+        return await signer_cache.get_or_fetch(user_id, lambda: _load_signer(user_id))
+    except LookupError:
+        return None
+
+
+async def acquire_signer(user_id):
+    """
+    Returns the user's Signer leased to the caller, or None if the user has no
+    wallet. The caller must call release() on it when done.
+    """
+    while True:
+        signer = await get_signer(user_id)
+        # Evicted and zeroed between being fetched and handed to us, fetch it again
+        if signer is None or signer.lease():
+            return signer
+
+
+@contextlib.asynccontextmanager
+async def lease_signer(user_id):
+    """
+    Yields the user's Signer, or None, and keeps its seed usable until the block exits.
+    """
+    signer = await acquire_signer(user_id)
+    try:
+        yield signer
+    finally:
+        if signer is not None:
+            signer.release()
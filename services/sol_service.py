@@ -1,24 +1,15 @@
 from solders.pubkey import Pubkey
 from solders.keypair import Keypair
-from solana.rpc.api import Client
+from services.rpc_pool import rpc_pool
 
-import os
-from dotenv import load_dotenv
-
-load_dotenv()
-
-# Solana configuration
-SOLANA_RPC_URL = os.getenv("SOLANA_RPC_URL")
-solana_client = Client(SOLANA_RPC_URL)
-
-def send_sol_transaction(sender_id, recipient_address, amount):
+async def send_sol_transaction(sender_id, recipient_address, amount):
     """
     Sends SOL from the user's wallet to the specified recipient.
     """
     from services.wallet_service import get_wallet_info
 
     # Retrieve sender wallet info
-    wallet = get_wallet_info(sender_id)
+    wallet = await get_wallet_info(sender_id)
     if not wallet:
         raise Exception("Sender wallet not found.")
 
@@ -41,7 +32,7 @@ def send_sol_transaction(sender_id, recipient_address, amount):
 
     # Send transaction
     try:
-        transaction = solana_client.request_airdrop(sender_keypair.pubkey(), lamports)
+        transaction = await rpc_pool.run("read", lambda rpc_client: rpc_client.request_airdrop(sender_keypair.pubkey(), lamports))
         return {"signature": transaction["result"]}
     except Exception as e:
         raise Exception(f"Transaction failed: {e}")
\ No newline at end of file
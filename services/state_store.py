@@ -0,0 +1,210 @@
+import asyncio
+import json
+import os
+from dotenv import load_dotenv
+from telegram.ext import BasePersistence, PersistenceInput
+
+from services.supabase_client import get_supabase
+
+load_dotenv()
+
+# "memory" keeps user_data inside this process, "supabase" shares it between workers and restarts
+PERSISTENCE_BACKEND = os.getenv("PERSISTENCE_BACKEND", "memory")
+# Seconds between the Application handing changed user_data over to be saved
+PERSISTENCE_UPDATE_INTERVAL = float(os.getenv("PERSISTENCE_UPDATE_INTERVAL", 1))
+# Re-read a user's data from the store before every update. Can be turned off
+# when users are pinned to one worker, then it's only read the first time a worker sees them.
+PERSISTENCE_REFRESH = os.getenv("PERSISTENCE_REFRESH", "true").lower() == "true"
+STATE_TABLE = "Bot-State"
+BATCH_SIZE = 500  # Rows per upsert
+RETRY_DELAY = 1  # Seconds before a failed write is retried, doubled per failure
+MAX_RETRY_DELAY = 60
+
+
+def _key(user_id):
+    return f"user:{user_id}"
+
+
+def _dumps(data):
+    return json.dumps(data, separators=(",", ":"), sort_keys=True)
+
+
+class InMemoryKVStore:
+    """
+    Process-local key-value store. Stand-in for a shared store in single-worker setups.
+    """
+
+    def __init__(self):
+        self._values = {}
+
+    async def get_many(self, keys):
+        return {key: self._values[key] for key in keys if key in self._values}
+
+    async def set_many(self, values):
+        self._values.update(values)
+
+    async def delete_many(self, keys):
+        for key in keys:
+            self._values.pop(key, None)
+
+
+class SupabaseKVStore:
+    """
+    Key-value store on a Supabase table with a text primary key "key" and a text "value".
+    """
+
+    def __init__(self, table=STATE_TABLE):
+        self.table = table
+
+    async def get_many(self, keys):
+        supabase = await get_supabase()
+        result = await supabase.table(self.table).select("key, value").in_("key", list(keys)).execute()
+        return {row["key"]: row["value"] for row in result.data}
+
+    async def set_many(self, values):
+        supabase = await get_supabase()
+        rows = [{"key": key, "value": value} for key, value in values.items()]
+        for i in range(0, len(rows), BATCH_SIZE):
+            await supabase.table(self.table).upsert(rows[i:i + BATCH_SIZE], on_conflict="key").execute()
+
+    async def delete_many(self, keys):
+        supabase = await get_supabase()
+        await supabase.table(self.table).delete().in_("key", list(keys)).execute()
+
+
+class UserDataPersistence(BasePersistence):
+    """
+    Keeps context.user_data (pending action and amount, coin card, settings and
+    send-SOL stages) in a key-value store, so a restarted or different worker
+    can pick up a user's flow where it left off.
+
+    Each user's data is stored as one compact JSON value. Users the Application
+    hands over in the same persistence pass are written in one batch, and
+    unchanged data is never rewritten.
+    """
+
+    def __init__(self, store, update_interval=PERSISTENCE_UPDATE_INTERVAL, refresh=PERSISTENCE_REFRESH):
+        super().__init__(
+            store_data=PersistenceInput(bot_data=False, chat_data=False, user_data=True, callback_data=False),
+            update_interval=update_interval,
+        )
+        self.store = store
+        self.refresh = refresh
+        self._saved = {}  # user_id -> value as last read from or written to the store
+        self._pending = {}  # user_id -> value waiting to be written
+        self._flush_task = None
+
+    async def get_user_data(self):
+        # Loaded per user in refresh_user_data, nothing to preload
+        return {}
+
+    async def get_chat_data(self):
+        return {}
+
+    async def get_bot_data(self):
+        return {}
+
+    async def get_callback_data(self):
+        return None
+
+    async def get_conversations(self, name):
+        return {}
+
+    async def refresh_user_data(self, user_id, user_data):
+        if user_id in self._pending:
+            return  # Our unsaved value is newer than the store's
+        saved = self._saved.get(user_id)
+        if saved is not None:
+            if not self.refresh:
+                return
+            if _dumps(user_data) != saved:
+                return  # Changed by a handler here and not handed over for saving yet
+
+        value = (await self.store.get_many([_key(user_id)])).get(_key(user_id), "{}")
+        self._saved[user_id] = value
+        if value != saved:
+            user_data.clear()
+            user_data.update(json.loads(value))
+
+    async def update_user_data(self, user_id, data):
+        value = _dumps(data)
+        if value == self._pending.get(user_id, self._saved.get(user_id)):
+            return
+        self._pending[user_id] = value
+        if self._flush_task is None or self._flush_task.done():
+            self._flush_task = asyncio.create_task(self._write_pending())
+
+    def _requeue(self, batch):
+        # Unless a newer value came in meanwhile
+        for user_id, value in batch.items():
+            self._pending.setdefault(user_id, value)
+
+    async def _write_batch(self):
+        batch, self._pending = self._pending, {}
+        try:
+            await self.store.set_many({_key(user_id): value for user_id, value in batch.items()})
+        except BaseException:
+            self._requeue(batch)
+            raise
+        self._saved.update(batch)
+
+    async def _write_pending(self):
+        # The Application hands over every changed user in one go, write them together
+        await asyncio.sleep(0)
+        delay = RETRY_DELAY
+        while self._pending:
+            try:
+                await self._write_batch()
+            except Exception as e:
+                # Retried from here, an unchanged user won't hand its data over again
+                print(f"Error saving user data, retrying in {delay}s: {e}")
+                await asyncio.sleep(delay)
+                delay = min(delay * 2, MAX_RETRY_DELAY)
+                continue
+            delay = RETRY_DELAY
+
+    async def drop_user_data(self, user_id):
+        self._pending.pop(user_id, None)
+        self._saved.pop(user_id, None)
+        await self.store.delete_many([_key(user_id)])
+
+    async def refresh_chat_data(self, chat_id, chat_data):
+        pass
+
+    async def refresh_bot_data(self, bot_data):
+        pass
+
+    async def update_chat_data(self, chat_id, data):
+        pass
+
+    async def update_bot_data(self, data):
+        pass
+
+    async def update_callback_data(self, data):
+        pass
+
+    async def update_conversation(self, name, key, new_state):
+        pass
+
+    async def drop_chat_data(self, chat_id):
+        pass
+
+    async def flush(self):
+        # A write that is backing off is cancelled, its batch is requeued and tried once more here
+        if self._flush_task is not None and not self._flush_task.done():
+            self._flush_task.cancel()
+            try:
+                await self._flush_task
+            except asyncio.CancelledError:
+                pass
+        if self._pending:
+            try:
+                await self._write_batch()
+            except Exception as e:
+                print(f"Error saving user data on shutdown, {len(self._pending)} users not saved: {e}")
+
+
+if PERSISTENCE_BACKEND == "supabase":
+    user_data_persistence = UserDataPersistence(SupabaseKVStore())
+else:
+    user_data_persistence = UserDataPersistence(InMemoryKVStore())
@@ -0,0 +1,24 @@
+import asyncio
+import os
+from dotenv import load_dotenv
+from supabase import acreate_client, AsyncClient
+
+load_dotenv()
+
+SUPABASE_URL = os.getenv("SUPABASE_URL")
+SUPABASE_KEY = os.getenv("SUPABASE_KEY")
+
+_supabase: AsyncClient = None
+_supabase_lock = asyncio.Lock()
+
+
+async def get_supabase() -> AsyncClient:
+    """
+    Returns the shared async Supabase client, creating it on first use.
+    """
+    global _supabase
+    if _supabase is None:
+        async with _supabase_lock:
+            if _supabase is None:
+                _supabase = await acreate_client(SUPABASE_URL, SUPABASE_KEY)
+    return _supabase
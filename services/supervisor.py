@@ -0,0 +1,284 @@
+import asyncio
+import bisect
+import hashlib
+import multiprocessing
+import os
+import queue
+import signal
+import time
+from collections import Counter
+from dotenv import load_dotenv
+from telegram import Bot, Update
+
+from services import metrics
+from services.metrics import WORKER_RESTARTS, WORKER_UPDATES_DISPATCHED, WORKER_UPDATES_PENDING, start_metrics_server
+from services.webhook_server import start_webhook, stop_signal
+
+load_dotenv()
+
+# Number of worker processes. 0 runs the bot in this process without a supervisor.
+SUPERVISOR_WORKERS = int(os.getenv("SUPERVISOR_WORKERS", 0))
+WORKER_STATS_INTERVAL = float(os.getenv("WORKER_STATS_INTERVAL", 5))
+WORKER_STOP_TIMEOUT = float(os.getenv("WORKER_STOP_TIMEOUT", 30))
+SUPERVISOR_REPORT_INTERVAL = float(os.getenv("SUPERVISOR_REPORT_INTERVAL", 60))
+HASH_RING_REPLICAS = 100  # Points per worker on the ring, evens out the spread of users
+POLL_TIMEOUT = 30  # getUpdates long poll, in seconds
+WATCH_INTERVAL = 1  # Seconds between checks for crashed workers
+
+
+def _hash(value):
+    return int.from_bytes(hashlib.blake2b(str(value).encode(), digest_size=8).digest(), "big")
+
+
+class HashRing:
+    """
+    Consistent hash ring. Adding or removing a node only moves the keys of that node.
+    """
+
+    def __init__(self, nodes, replicas=HASH_RING_REPLICAS):
+        self._points = sorted((_hash(f"{node}:{i}"), node) for node in nodes for i in range(replicas))
+        self._hashes = [point for point, _ in self._points]
+
+    def node(self, key):
+        i = bisect.bisect(self._hashes, _hash(key)) % len(self._points)
+        return self._points[i][1]
+
+
+def routing_key(data):
+    """
+    Returns the id an update is routed by: its user, else its chat, else the update id.
+    """
+    for payload in data.values():
+        if not isinstance(payload, dict):
+            continue
+        user = payload.get("from") or payload.get("user")
+        if user:
+            return user["id"]
+        chat = payload.get("chat") or payload.get("message", {}).get("chat")
+        if chat:
+            return chat["id"]
+    return data.get("update_id")
+
+
+def run_worker(index, build_application, token, inbox, stats):
+    """
+    Worker process entry point: runs one Application fed with updates from inbox.
+    """
+    # The supervisor handles Ctrl-C and stops workers through their inbox
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    asyncio.run(_worker(index, build_application, token, inbox, stats))
+
+
+async def _report(index, application, received, stats):
+    processor = application.update_processor
+    while True:
+        await asyncio.sleep(WORKER_STATS_INTERVAL)
+        stats.put((index, {
+            "received": received[0],
+            "queued": application.update_queue.qsize(),
+            "waiting": getattr(processor, "waiting", 0),
+            "in_progress": getattr(processor, "in_progress", 0),
+        }))
+
+
+async def _worker(index, build_application, token, inbox, stats):
+    # Each worker serves its own scrape endpoint, right after the supervisor's
+    if metrics.METRICS_PORT:
+        metrics.METRICS_PORT = str(int(metrics.METRICS_PORT) + 1 + index)
+
+    application = build_application(token)
+    await application.initialize()
+    if application.post_init:
+        await application.post_init(application)
+    await application.start()
+
+    loop = asyncio.get_running_loop()
+    received = [0]
+    reporter = asyncio.create_task(_report(index, application, received, stats))
+    try:
+        while True:
+            kind, data = await loop.run_in_executor(None, inbox.get)
+            if kind == "stop":
+                break
+            received[0] += 1
+            application.update_queue.put_nowait(Update.de_json(data, application.bot))
+    finally:
+        reporter.cancel()
+        # Finishes every update already queued before returning
+        await application.stop()
+        if application.post_shutdown:
+            await application.post_shutdown(application)
+        await application.shutdown()
+
+
+class Supervisor:
+    """
+    Receives updates once and routes each to one of N worker processes by a
+    consistent hash of the user id, so a user always lands on the same worker
+    and keeps its in-process caches and per-user ordering.
+
+    A worker is restarted by sending it a stop message: it finishes what it
+    was sent, exits, and a fresh process picks up the same inbox, so nothing
+    is dropped or reordered. SIGHUP restarts every worker one at a time.
+    """
+
+    def __init__(self, build_application, token, workers=SUPERVISOR_WORKERS):
+        self.build_application = build_application
+        self.token = token
+        self.ring = HashRing(range(workers))
+        self._context = multiprocessing.get_context("spawn")
+        self.inboxes = [self._context.Queue() for _ in range(workers)]
+        self.stats = self._context.Queue()
+        self.processes = [None] * workers
+        self.load = [{} for _ in range(workers)]
+        self.dispatched = Counter()
+        self._restarting = set()
+
+    def _start_worker(self, index):
+        process = self._context.Process(
+            target=run_worker,
+            args=(index, self.build_application, self.token, self.inboxes[index], self.stats),
+            name=f"bot-worker-{index}",
+            daemon=True,
+        )
+        process.start()
+        self.processes[index] = process
+
+    def start(self):
+        for index in range(len(self.processes)):
+            self._start_worker(index)
+
+    def dispatch(self, data):
+        index = self.ring.node(routing_key(data))
+        self.inboxes[index].put(("update", data))
+        self.dispatched[index] += 1
+        WORKER_UPDATES_DISPATCHED.labels(worker=str(index)).inc()
+
+    async def restart_worker(self, index, reason="requested"):
+        self._restarting.add(index)
+        try:
+            process = self.processes[index]
+            if process.is_alive():
+                self.inboxes[index].put(("stop", None))
+                await asyncio.get_running_loop().run_in_executor(None, process.join, WORKER_STOP_TIMEOUT)
+                if process.is_alive():
+                    print(f"Worker {index} did not stop within {WORKER_STOP_TIMEOUT}s, terminating it")
+                    process.terminate()
+                    process.join()
+            self._start_worker(index)
+            WORKER_RESTARTS.labels(worker=str(index), reason=reason).inc()
+        finally:
+            self._restarting.discard(index)
+
+    async def rolling_restart(self):
+        for index in range(len(self.processes)):
+            await self.restart_worker(index)
+        print("All workers restarted")
+
+    async def stop(self):
+        for inbox in self.inboxes:
+            inbox.put(("stop", None))
+        loop = asyncio.get_running_loop()
+        for process in self.processes:
+            await loop.run_in_executor(None, process.join, WORKER_STOP_TIMEOUT)
+            if process.is_alive():
+                process.terminate()
+
+    def _inbox_size(self, index):
+        try:
+            return self.inboxes[index].qsize()
+        except NotImplementedError:  # macOS
+            return 0
+
+    def _take_stats(self, timeout):
+        # Waits up to timeout for a report, then takes what is already queued, for at most timeout more
+        reports = [self.stats.get(True, timeout)]
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            try:
+                reports.append(self.stats.get_nowait())
+            except queue.Empty:
+                break
+        return reports
+
+    async def watch(self):
+        """
+        Restarts crashed workers and collects their load reports.
+        """
+        loop = asyncio.get_running_loop()
+        last_report = time.monotonic()
+        while True:
+            for index, process in enumerate(self.processes):
+                if index not in self._restarting and not process.is_alive():
+                    print(f"Worker {index} exited with code {process.exitcode}, restarting it")
+                    self._restarting.add(index)
+                    asyncio.create_task(self.restart_worker(index, "crashed"))
+
+            # Bounded, so a steady stream of reports can't hold off the liveness check above
+            try:
+                reports = await loop.run_in_executor(None, self._take_stats, WATCH_INTERVAL)
+            except queue.Empty:
+                reports = []
+            for index, load in reports:
+                load["inbox"] = self._inbox_size(index)
+                self.load[index] = load
+                WORKER_UPDATES_PENDING.labels(worker=str(index)).set(
+                    load["inbox"] + load["queued"] + load["waiting"] + load["in_progress"]
+                )
+
+            if time.monotonic() - last_report >= SUPERVISOR_REPORT_INTERVAL:
+                last_report = time.monotonic()
+                print(f"Worker load: {self.report()}")
+
+    def report(self):
+        return [
+            {"worker": index, "dispatched": self.dispatched[index], **self.load[index]}
+            for index in range(len(self.processes))
+        ]
+
+
+async def _poll(bot, supervisor, stop):
+    await bot.delete_webhook()
+    offset = None
+    while not stop.is_set():
+        try:
+            updates = await bot.get_updates(offset=offset, timeout=POLL_TIMEOUT, allowed_updates=Update.ALL_TYPES)
+        except Exception as e:
+            print(f"Error polling updates: {e}")
+            await asyncio.sleep(1)
+            continue
+        for update in updates:
+            supervisor.dispatch(update.to_dict())
+            offset = update.update_id + 1
+
+
+async def run_supervisor(build_application, token, mode="polling", workers=SUPERVISOR_WORKERS):
+    """
+    Runs the supervisor until SIGINT or SIGTERM, taking updates over a webhook
+    or long polling and sharding them over worker processes.
+    """
+    stop = stop_signal()
+    supervisor = Supervisor(build_application, token, workers)
+    asyncio.get_running_loop().add_signal_handler(
+        signal.SIGHUP, lambda: asyncio.ensure_future(supervisor.rolling_restart()),
+    )
+    start_metrics_server()
+    supervisor.start()
+    watcher = asyncio.create_task(supervisor.watch())
+
+    runner = None
+    poller = None
+    try:
+        async with Bot(token) as bot:
+            if mode == "webhook":
+                runner = await start_webhook(bot, supervisor.dispatch)
+            else:
+                poller = asyncio.create_task(_poll(bot, supervisor, stop))
+            await stop.wait()
+            if poller is not None:
+                poller.cancel()
+    finally:
+        if runner is not None:
+            await runner.cleanup()
+        watcher.cancel()
+        await supervisor.stop()
@@ -0,0 +1,106 @@
+import asyncio
+import contextlib
+import os
+import sys
+import time
+from dotenv import load_dotenv
+from telegram.ext import BaseUpdateProcessor
+
+from services.metrics import UPDATE_WAIT_SECONDS, UPDATES_IN_PROGRESS, UPDATES_WAITING
+
+load_dotenv()
+
+# Upper bound on updates being handled at once, across all users
+UPDATE_CONCURRENCY = int(os.getenv("UPDATE_CONCURRENCY", 256))
+
+
+class OrderedUpdateProcessor(BaseUpdateProcessor):
+    """
+    Handles different users' updates in parallel, but one at a time per user and per chat.
+
+    Flows keep state in context.user_data between updates (the pending action
+    and amount, the coin card, the send-SOL stage), so a user's updates must
+    run in the order they arrived. Each update first waits for the earlier
+    updates of its user and chat, and only then for one of the global slots,
+    so a user with a backlog never holds slots other users could run in.
+
+    BaseUpdateProcessor.process_update (final) holds the base semaphore for
+    the whole do_process_update, waiting included, so its limit is left
+    open and the slots are this class's own semaphore, taken after the locks.
+    """
+
+    def __init__(self, max_concurrent_updates=UPDATE_CONCURRENCY):
+        super().__init__(sys.maxsize)
+        self._max_concurrent = max_concurrent_updates
+        self._slots = asyncio.BoundedSemaphore(max_concurrent_updates)
+        self._locks = {}  # ("user" | "chat", id) -> [lock, number of updates using it]
+        self.waiting = 0
+        self.in_progress = 0
+
+    @staticmethod
+    def _keys(update):
+        keys = []
+        if getattr(update, "effective_user", None) is not None:
+            keys.append(("user", update.effective_user.id))
+        if getattr(update, "effective_chat", None) is not None:
+            keys.append(("chat", update.effective_chat.id))
+        # A fixed order keeps two updates from taking each other's locks first
+        return sorted(keys)
+
+    def _hold(self, key):
+        entry = self._locks.get(key)
+        if entry is None:
+            entry = self._locks[key] = [asyncio.Lock(), 0]
+        entry[1] += 1
+        return entry[0]
+
+    def _release(self, key):
+        entry = self._locks[key]
+        entry[1] -= 1
+        if entry[1] == 0:
+            del self._locks[key]
+
+    @property
+    def max_concurrent_updates(self):
+        return self._max_concurrent
+
+    async def do_process_update(self, update, coroutine):
+        # Locks are taken in arrival order (asyncio.Lock wakes waiters FIFO), so
+        # the first await here must be the first lock. The open base semaphore
+        # acquired before this never suspends.
+        keys = self._keys(update)
+        locks = [self._hold(key) for key in keys]
+        started = time.perf_counter()
+        waiting = True
+        self.waiting += 1
+        UPDATES_WAITING.inc()
+        try:
+            async with contextlib.AsyncExitStack() as stack:
+                for lock in locks:
+                    await stack.enter_async_context(lock)
+                async with self._slots:
+                    self.waiting -= 1
+                    UPDATES_WAITING.dec()
+                    waiting = False
+                    UPDATE_WAIT_SECONDS.observe(time.perf_counter() - started)
+                    self.in_progress += 1
+                    UPDATES_IN_PROGRESS.inc()
+                    try:
+                        await coroutine
+                    finally:
+                        self.in_progress -= 1
+                        UPDATES_IN_PROGRESS.dec()
+        finally:
+            if waiting:
+                self.waiting -= 1
+                UPDATES_WAITING.dec()
+                # Cancelled before it ran, don't leave the coroutine unawaited
+                coroutine.close()
+            for key in keys:
+                self._release(key)
+
+    async def initialize(self):
+        pass
+
+    async def shutdown(self):
+        pass
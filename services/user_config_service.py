@@ -1,57 +1,113 @@
-from supabase import create_client
 import os
 from dotenv import load_dotenv
 
+from services.cache import AsyncTTLCache
+from services.pubsub import PROCESS_ID, pubsub
+from services.supabase_client import get_supabase
+
 load_dotenv()
 
-SUPABASE_URL = os.getenv("SUPABASE_URL")
-SUPABASE_KEY = os.getenv("SUPABASE_KEY")
-supabase = create_client(SUPABASE_URL, SUPABASE_KEY)
+# Configs are written through on update and invalidated across replicas via pub/sub.
+# The TTL only bounds staleness if an invalidation message is ever missed.
+USER_CONFIG_TTL = float(os.getenv("USER_CONFIG_TTL", 600))
+USER_CONFIG_CACHE_SIZE = int(os.getenv("USER_CONFIG_CACHE_SIZE", 10000))
+USER_CONFIG_CHANNEL = "user-config"
+
+config_cache = AsyncTTLCache(maxsize=USER_CONFIG_CACHE_SIZE, ttl=USER_CONFIG_TTL)
 
+DEFAULT_CONFIG = {
+    'buy_left': 1.0,
+    'buy_right': 5.0,
+    'sell_left': 0.25,
+    'sell_right': 1.0,
+    'sell_initial': True,
+    'slippage_buy': 0.1,
+    'slippage_sell': 1.0,
+    'max_price_impact': 0.25,
+    'mev_protect': True,
+    'transaction_priority': 'medium',
+    'tp_medium': 0.00100,
+    'tp_high': 0.00500,
+    'tp_very_high': 0.01000,
+}
 
-def create_user_config(user_id):
+
+async def create_user_config(user_id):
     """
     Creates a User-Config row with default values for the given user_id.
+    Returns the new row, or None if one already exists.
     """
-    # Check if the User-Config row already exists
-    result = supabase.table("User-Config").select("*").eq("user_id", user_id).execute()
+    supabase = await get_supabase()
 
-    if result.data:
+    # Insert the default row in one round trip, leaving an existing row untouched
+    result = await supabase.table("User-Config").upsert(
+        {"user_id": user_id, **DEFAULT_CONFIG},
+        on_conflict="user_id",
+        ignore_duplicates=True,
+    ).execute()
+
+    if not result.data:
         return None  # User-Config already exists
 
-    # Insert default User-Config row
-    default_config = {
-        "user_id": user_id,
-        'buy_left': 1.0,
-        'buy_right': 5.0,
-        'sell_left': 0.25,
-        'sell_right': 1.0,
-        'sell_initial': True,
-        'slippage_buy': 0.1,
-        'slippage_sell': 1.0,
-        'max_price_impact': 0.25,
-        'mev_protect': True,
-        'transaction_priority': 'medium',
-        'tp_medium': 0.00100,
-        'tp_high': 0.00500,
-        'tp_very_high': 0.01000,
-    }
-    supabase.table("User-Config").insert(default_config).execute()
-
-
-def fetch_user_config(user_id):
+    config_cache.set(user_id, result.data[0])
+    return result.data[0]
+
+
+async def _load_user_config(user_id):
+    supabase = await get_supabase()
+    result = await supabase.table("User-Config").select("*").eq("user_id", user_id).execute()
+    if result.data:
+        return result.data[0]
+
+    # No row yet: insert the defaults and get the row back in the same round trip
+    result = await supabase.table("User-Config").upsert(
+        {"user_id": user_id, **DEFAULT_CONFIG},
+        on_conflict="user_id",
+        ignore_duplicates=True,
+    ).execute()
+    if result.data:
+        return result.data[0]
+
+    # Created, and maybe already edited, since our select; read it rather than overwrite it
+    result = await supabase.table("User-Config").select("*").eq("user_id", user_id).execute()
+    return result.data[0]
+
+
+async def fetch_user_config(user_id):
     """
     Fetch the User-Config row for the given user_id.
     """
-    result = supabase.table("User-Config").select("*").eq("user_id", user_id).execute()
+    config = await config_cache.get_or_fetch(user_id, lambda: _load_user_config(user_id))
+    return dict(config)
+
+async def update_user_config(user_id, updates):
+    """
+    Updates the User-Config row for the given user_id with new values.
+    """
+    supabase = await get_supabase()
+    result = await supabase.table("User-Config").update(updates).eq("user_id", user_id).execute()
+
     if result.data:
-        return result.data[0]
+        config_cache.set(user_id, result.data[0])
     else:
-        create_user_config(user_id)
-        return fetch_user_config(user_id)
+        config_cache.pop(user_id)
 
-def update_user_config(user_id, updates):
+    await pubsub.publish(USER_CONFIG_CHANNEL, {"user_id": user_id, "origin": PROCESS_ID})
+
+
+def _on_config_changed(message):
+    # Our own writes already updated the cache
+    if message.get("origin") != PROCESS_ID:
+        config_cache.pop(message["user_id"])
+
+
+async def start_config_sync(_application=None):
     """
-    Updates the User-Config row for the given user_id with new values.
+    Subscribes the config cache to invalidations from other replicas.
     """
-    supabase.table("User-Config").update(updates).eq("user_id", user_id).execute()
\ No newline at end of file
+    await pubsub.start()
+    await pubsub.subscribe(USER_CONFIG_CHANNEL, _on_config_changed)
+
+
+async def stop_config_sync(_application=None):
+    await pubsub.stop()
@@ -3,18 +3,20 @@ import datetime
 import httpx
 from solders.keypair import Keypair
 from solders.pubkey import Pubkey
-from solana.rpc.api import Client
 from solana.rpc.types import TokenAccountOpts
 import base64
+import hashlib
 import os
 from dotenv import load_dotenv
-from supabase import create_client
-from dotenv import load_dotenv
-from cachetools import TTLCache
-
-import requests
+from cachetools import LRUCache, TTLCache
+from math import ceil
 
+from services.cache import AsyncTTLCache
+from services.http_client import get_http_client
+from services.metrics import UPSTREAM_REQUEST_SECONDS, observe
+from services.supabase_client import get_supabase
 from services.user_config_service import create_user_config
+from services.wallet_watcher import wallet_watcher
 
 # Define the TTL cache (maxsize=100, ttl=3600 seconds = 1 hour)
 cache = TTLCache(maxsize=100, ttl=900)
@@ -25,29 +27,36 @@ HELIUS_API_KEY = os.getenv("HELIUS_API_KEY")  # Store your Helius API key in an
 HELIUS_API_URL = "https://api.helius.xyz/v0/addresses/{address}/transactions/"
 
 SOLANA_FM_TRANSACTIONS_URL = "https://api.solana.fm/v0/accounts/{address}/transfers"
-SOLANA_FM_BALANCE_URL = "https://api.solana.fm/v1/tokens/{address}/token-accounts"
 
 
-SOL_TRACKER_API_URL = "https://data.solanatracker.io/wallet/{address}"
+SOL_TRACKER_DATA_URL = os.getenv("SOL_TRACKER_DATA_URL", "https://data.solanatracker.io")
+SOL_TRACKER_API_URL = SOL_TRACKER_DATA_URL + "/wallet/{address}"
 
 
 
 load_dotenv()
 
-SUPABASE_URL = os.getenv("SUPABASE_URL")
-SUPABASE_KEY = os.getenv("SUPABASE_KEY")
-supabase = create_client(SUPABASE_URL, SUPABASE_KEY)
 SOL_TRACKER_KEY = os.getenv("SOL_TRACKER_KEY")
+# httpx rejects a None header, so the key is only sent when it is set
+SOL_TRACKER_HEADERS = {"x-api-key": SOL_TRACKER_KEY} if SOL_TRACKER_KEY else {}
 
+# Wallet token lists are cached per wallet so paging doesn't re-download them
+PORTFOLIO_TTL = float(os.getenv("PORTFOLIO_TTL", 30))
+PORTFOLIO_CACHE_SIZE = int(os.getenv("PORTFOLIO_CACHE_SIZE", 2048))
+portfolio_cache = AsyncTTLCache(maxsize=PORTFOLIO_CACHE_SIZE, ttl=PORTFOLIO_TTL)
 
+# Rendered QR PNGs by the data they encode, empty QR_CACHE_DIR keeps them in memory only
+QR_CACHE_DIR = os.getenv("QR_CACHE_DIR", "qr_cache")
+QR_CACHE_SIZE = int(os.getenv("QR_CACHE_SIZE", 1024))
+qr_cache = LRUCache(maxsize=QR_CACHE_SIZE)
 
-SOLANA_RPC_URL = "https://api.mainnet-beta.solana.com"  # Replace with "https://api.devnet.solana.com" for testing
 
-def create_wallet(user_id):
+async def create_wallet(user_id):
     """
     Creates a wallet for the user if it doesn't exist.
     """
-    result = supabase.table("Wallets").select("public_key").eq("user_id", user_id).execute()
+    supabase = await get_supabase()
+    result = await supabase.table("Wallets").select("public_key").eq("user_id", user_id).execute()
     if result.data:
         return None  # Wallet already exists
 
@@ -58,7 +67,7 @@ def create_wallet(user_id):
     private_key = base64.b64encode(bytes(keypair.secret())).decode()  # Encode private key in Base64
 
 
-    supabase.table("Wallets").insert({
+    await supabase.table("Wallets").insert({
         "user_id": user_id,
         "public_key": public_key,
         "private_key": private_key
@@ -66,34 +75,30 @@ def create_wallet(user_id):
 
     return {"public_key": public_key}
 
-def get_wallet_info(user_id):
+async def get_wallet_info(user_id):
     """
     Retrieves wallet info and balance from the database and Solana blockchain.
     """
 
     # Fetch the wallet details from the database
-    result = supabase.table("Wallets").select("public_key").eq("user_id", user_id).execute()
-    if not result.data:
-        result = create_wallet(user_id)
-        create_user_config(user_id)
+    public_key_str = await get_wallet_public_key(user_id)
+    if not public_key_str:
+        wallet = await create_wallet(user_id)
+        await create_user_config(user_id)
+        public_key_str = wallet["public_key"]
 
     # Extract the public key
-    public_key_str = result.data[0]["public_key"]
     public_key = Pubkey.from_string(public_key_str)
 
-    url = SOLANA_FM_BALANCE_URL.format(address=public_key)
-    response = requests.post(url, json={ "includeSolBalance": True })
-    response_json = response.json()
-    balance_sol = response_json['solBalance']
-    filtered_token_accounts = [token for token in response_json['tokenAccounts'] if token['info']['tokenAmount']['uiAmount'] > 0]
-    num_coins = len(filtered_token_accounts)
+    # Served from memory for watched wallets, kept current by websocket pushes
+    wallet = await wallet_watcher.get(public_key)
 
-    return {"public_key": public_key, "balance": balance_sol, "num_coins": num_coins}
+    return {"public_key": public_key, "balance": wallet["balance"], "num_coins": wallet["num_coins"]}
 
 
-def generate_qr_code(data):
+def render_qr_code(data):
     """
-    Generates a QR code for the given data.
+    Renders a QR code for the given data as PNG bytes. CPU bound, run it in a thread.
     """
     import qrcode
     import io
@@ -105,57 +110,101 @@ def generate_qr_code(data):
     img = qr.make_image(fill="black", back_color="white")
     output = io.BytesIO()
     img.save(output, "PNG")
-    output.seek(0)
-    return output
+    return output.getvalue()
+
+
+def _qr_path(data):
+    return os.path.join(QR_CACHE_DIR, hashlib.sha256(str(data).encode()).hexdigest() + ".png")
+
+
+def _load_or_render_qr_code(data):
+    path = _qr_path(data)
+    try:
+        with open(path, "rb") as f:
+            return f.read()
+    except FileNotFoundError:
+        pass
+
+    png = render_qr_code(data)
+    try:
+        os.makedirs(QR_CACHE_DIR, exist_ok=True)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(png)
+        os.replace(tmp_path, path)
+    except OSError as e:
+        print(f"Error caching QR code to {path}: {e}")
+    return png
 
 
+async def generate_qr_code(data):
+    """
+    Returns the QR code for the given data as PNG bytes.
+
+    The output only depends on data, so renders are kept in memory and in
+    QR_CACHE_DIR. Disk reads and renders run in a worker thread.
+    """
+    png = qr_cache.get(str(data))
+    if png is None:
+        png = await asyncio.to_thread(_load_or_render_qr_code if QR_CACHE_DIR else render_qr_code, data)
+        qr_cache[str(data)] = png
+    return png
 
-def get_wallet_public_key(user_id):
+
+async def get_wallet_public_key(user_id):
     """Fetch the public key for a user's wallet from Supabase."""
-    result = supabase.table("Wallets").select("public_key").eq("user_id", user_id).execute()
+    supabase = await get_supabase()
+    result = await supabase.table("Wallets").select("public_key").eq("user_id", user_id).execute()
     if result.data:
         return result.data[0]["public_key"]
     return None
 
+async def _load_portfolio(public_key):
+    url = SOL_TRACKER_API_URL.format(address=public_key)
+
+    # Make the request to SolanaTracker API
+    with observe(UPSTREAM_REQUEST_SECONDS, upstream="wallet_tokens"):
+        response = await get_http_client(url).get(url, headers=SOL_TRACKER_HEADERS)
+    if response.status_code != 200:
+        raise Exception(f"SolanaTracker API returned {response.status_code}: {response.text}")
+
+    # Sorted and formatted once per snapshot, page views only slice it
+    tokens = sorted(response.json()['tokens'], key=lambda token: token.get('value') or 0, reverse=True)
+    return [
+        {
+            "name": token["token"]["name"],
+            "symbol": token["token"]["symbol"],
+            "balance": f"{token['balance']:.9f} {token['token']['symbol']}",
+            "usd_value": f"${token['value']:.2f}",
+            "image": token["token"]["image"],
+            'mint_address': token['token']['mint'],
+        }
+        for token in tokens
+    ]
+
+
 async def fetch_trades(public_key, page=1, limit=10):
     """
-    Fetch trades for a public key using SolanaTracker API.
+    Fetch a page of the wallet's tokens, largest USD value first.
+
+    The wallet is downloaded once per PORTFOLIO_TTL and every page is served
+    from that snapshot.
 
     Args:
-        public_key (str): The public key to fetch transactions for.
-        page (int): The page number for pagination.
-        limit (int): The number of items to fetch per page.
+        public_key (str): The public key to fetch tokens for.
+        page (int): The page number, starting at 1. Clamped to the pages available.
+        limit (int): The number of items per page.
 
     Returns:
-        dict: A dictionary containing paginated trade data and total pages.
+        dict: The page's trades, the page number, total pages and total number of tokens.
     """
     try:
-        # Construct the API request URL
-        url = SOL_TRACKER_API_URL.format(address=public_key)
-
-        # Make the request to SolanaTracker API
-        response = requests.get(url, headers={"x-api-key": SOL_TRACKER_KEY})
-        if response.status_code != 200:
-            raise Exception(f"SolanaTracker API returned {response.status_code}: {response.text}")
-
-        # Parse the response
-        data = response.json()
-
-        # Format the data for display
-        formatted_trades = [
-            {
-                "name": token["token"]["name"],
-                "symbol": token["token"]["symbol"],
-                "balance": f"{token['balance']:.9f} {token['token']['symbol']}",
-                "usd_value": f"${token['value']:.2f}",
-                "image": token["token"]["image"],
-                'mint_address': token['token']['mint'],
-            }
-            for token in data['tokens']
-        ]
-
-        return formatted_trades
-
+        trades = await portfolio_cache.get_or_fetch(str(public_key), lambda: _load_portfolio(public_key))
     except Exception as e:
         print(f"Error fetching trades from SolanaTracker: {e}")
-        return {"trades": [], "total_pages": 0}
\ No newline at end of file
+        return {"trades": [], "page": 1, "total_pages": 0, "total": 0}
+
+    total_pages = ceil(len(trades) / limit)
+    page = min(max(page, 1), max(total_pages, 1))
+    start = (page - 1) * limit
+    return {"trades": trades[start:start + limit], "page": page, "total_pages": total_pages, "total": len(trades)}
@@ -0,0 +1,246 @@
+import asyncio
+import base64
+import os
+import time
+from collections import OrderedDict
+from dotenv import load_dotenv
+from solana.rpc.commitment import Confirmed
+from solana.rpc.types import TokenAccountOpts
+from solders.pubkey import Pubkey
+
+from services.rpc_pool import rpc_pool
+from services.rpc_websocket import get_rpc_websocket, to_ws_url
+
+load_dotenv()
+
+# "false" reads every wallet straight from RPC
+WALLET_WATCH = os.getenv("WALLET_WATCH", "true").lower() == "true"
+# Defaults to the websocket of the healthiest read endpoint
+WALLET_WATCH_WS_URL = os.getenv("WALLET_WATCH_WS_URL")
+# A wallet nobody read for this many seconds is unsubscribed
+WALLET_WATCH_IDLE = float(os.getenv("WALLET_WATCH_IDLE", 600))
+WALLET_WATCH_MAX = int(os.getenv("WALLET_WATCH_MAX", 2000))
+# Watched wallets are reloaded this often anyway, in case a push didn't cover a change
+WALLET_WATCH_RESYNC = float(os.getenv("WALLET_WATCH_RESYNC", 300))
+WALLET_WATCH_SWEEP_INTERVAL = float(os.getenv("WALLET_WATCH_SWEEP_INTERVAL", 60))
+
+TOKEN_PROGRAM_IDS = (
+    "TokenkegQfeZyiNwAJbNbGKPFXCWuBvf9Ss623VQ5DA",  # SPL Token
+    "TokenzQdBNbLqP5VEhdkAS6EPFLC1PHnBqCXEpPxuEb",  # Token-2022
+)
+# Token account layout: mint (32 bytes), owner (32 bytes), amount (u64, little endian)
+TOKEN_OWNER_OFFSET = 32
+TOKEN_AMOUNT_OFFSET = 64
+
+
+def _token_amount(data):
+    return int.from_bytes(data[TOKEN_AMOUNT_OFFSET:TOKEN_AMOUNT_OFFSET + 8], "little")
+
+
+def _summary(lamports, token_amounts):
+    return {
+        "balance": lamports / 1e9,
+        "num_coins": sum(1 for amount in token_amounts.values() if amount > 0),
+    }
+
+
+async def load_wallet(public_key):
+    """
+    Reads the wallet's lamports and the raw amount of each of its token accounts from RPC.
+    """
+    owner = Pubkey.from_string(str(public_key))
+    balance, *token_accounts = await rpc_pool.run("read", lambda rpc_client: asyncio.gather(
+        rpc_client.get_balance(owner, Confirmed),
+        *(
+            rpc_client.get_token_accounts_by_owner(owner, TokenAccountOpts(program_id=Pubkey.from_string(program_id)), Confirmed)
+            for program_id in TOKEN_PROGRAM_IDS
+        ),
+    ))
+    token_amounts = {
+        str(account.pubkey): _token_amount(bytes(account.account.data))
+        for response in token_accounts
+        for account in response.value
+    }
+    return balance.value, token_amounts
+
+
+class WalletWatcher:
+    """
+    Keeps the SOL balance and token count of recently active wallets in memory.
+
+    A watched wallet holds an accountSubscribe on itself and a programSubscribe
+    per token program filtered to the accounts it owns, all on the shared RPC
+    websocket. Every notification updates the cached values in place, so a
+    read right after a trade lands already sees it. Wallets that go unread for
+    `idle` seconds are unsubscribed. While the socket is down, or before it
+    first connects, wallets are read straight from RPC.
+    """
+
+    def __init__(self, ws_url=WALLET_WATCH_WS_URL, idle=WALLET_WATCH_IDLE, max_wallets=WALLET_WATCH_MAX,
+                 resync=WALLET_WATCH_RESYNC, sweep_interval=WALLET_WATCH_SWEEP_INTERVAL):
+        self.ws_url = ws_url
+        self.idle = idle
+        self.max_wallets = max_wallets
+        self.resync = resync
+        self.sweep_interval = sweep_interval
+        self._wallets = OrderedDict()  # public key -> wallet dict, least recently read first
+        self._websocket = None
+        self._task = None
+
+    def _get_websocket(self):
+        if self._websocket is None:
+            self._websocket = get_rpc_websocket(self.ws_url or to_ws_url(rpc_pool.pick("read")))
+            self._websocket.add_disconnect_callback(self._on_disconnect)
+        return self._websocket
+
+    def _on_disconnect(self):
+        # Pushes are missed until the subscriptions are reopened, reload on the next read
+        for wallet in self._wallets.values():
+            wallet["ready"] = None
+
+    async def get(self, public_key):
+        """
+        Returns {"balance": SOL, "num_coins": token accounts holding a balance} for the wallet.
+        """
+        public_key = str(public_key)
+        if not WALLET_WATCH or not self._get_websocket().connected:
+            return _summary(*await load_wallet(public_key))
+
+        wallet = self._wallets.get(public_key)
+        if wallet is None:
+            wallet = self._add(public_key)
+        else:
+            self._wallets.move_to_end(public_key)
+        wallet["last_read"] = time.monotonic()
+
+        if wallet["ready"] is not None and wallet["ready"].done() and time.monotonic() - wallet["loaded_at"] > self.resync:
+            wallet["ready"] = None
+        if wallet["ready"] is None:
+            wallet["ready"] = asyncio.ensure_future(self._refresh(wallet))
+        ready = wallet["ready"]
+        try:
+            # Shield so one cancelled reader doesn't cancel the load for the others
+            await asyncio.shield(ready)
+        except Exception as e:
+            print(f"Error watching wallet {public_key}, reading it from RPC: {e}")
+            if wallet["ready"] is ready:
+                wallet["ready"] = None
+            return _summary(*await load_wallet(public_key))
+        return _summary(wallet["lamports"], wallet["token_amounts"])
+
+    def _add(self, public_key):
+        wallet = self._wallets[public_key] = {
+            "public_key": public_key,
+            "lamports": 0,
+            "token_amounts": {},  # token account -> raw amount
+            "subscriptions": [],  # (subscription key, callback)
+            "pushed": None,  # what notifications changed while a load was in flight
+            "ready": None,  # future of the current load
+            "loaded_at": 0.0,
+            "last_read": time.monotonic(),
+        }
+        while len(self._wallets) > self.max_wallets:
+            _, oldest = self._wallets.popitem(last=False)
+            asyncio.ensure_future(self._unsubscribe(oldest))
+        return wallet
+
+    async def _subscribe(self, wallet):
+        websocket = self._get_websocket()
+
+        def on_account(result):
+            wallet["lamports"] = result["value"]["lamports"]
+            if wallet["pushed"] is not None:
+                wallet["pushed"].add(None)
+
+        def on_token_account(result):
+            value = result["value"]
+            data = base64.b64decode(value["account"]["data"][0])
+            wallet["token_amounts"][value["pubkey"]] = _token_amount(data)
+            if wallet["pushed"] is not None:
+                wallet["pushed"].add(value["pubkey"])
+
+        subscriptions = [("accountSubscribe", [wallet["public_key"], {"encoding": "base64", "commitment": "confirmed"}], on_account)]
+        for program_id in TOKEN_PROGRAM_IDS:
+            subscriptions.append(("programSubscribe", [program_id, {
+                "encoding": "base64",
+                "commitment": "confirmed",
+                "filters": [{"memcmp": {"offset": TOKEN_OWNER_OFFSET, "bytes": wallet["public_key"]}}],
+            }], on_token_account))
+
+        try:
+            for method, params, callback in subscriptions:
+                key = await websocket.subscribe(method, params, callback)
+                wallet["subscriptions"].append((key, callback))
+        except Exception:
+            await self._unsubscribe(wallet)
+            raise
+
+        # Evicted while subscribing, don't leave its subscriptions open
+        if self._wallets.get(wallet["public_key"]) is not wallet:
+            await self._unsubscribe(wallet)
+
+    async def _refresh(self, wallet):
+        if not wallet["subscriptions"]:
+            await self._subscribe(wallet)
+
+        # Subscribed before loading, so anything pushed during the load is newer than it
+        wallet["pushed"] = set()
+        try:
+            lamports, token_amounts = await load_wallet(wallet["public_key"])
+            pushed = wallet["pushed"]
+        finally:
+            wallet["pushed"] = None
+
+        if None not in pushed:
+            wallet["lamports"] = lamports
+        token_amounts.update({account: wallet["token_amounts"][account] for account in pushed if account is not None})
+        wallet["token_amounts"] = token_amounts
+        wallet["loaded_at"] = time.monotonic()
+
+    async def _unsubscribe(self, wallet):
+        subscriptions, wallet["subscriptions"] = wallet["subscriptions"], []
+        for key, callback in subscriptions:
+            await self._websocket.unsubscribe(key, callback)
+
+    async def sweep(self):
+        """
+        Unsubscribes wallets nobody read for `idle` seconds.
+        """
+        now = time.monotonic()
+        idle = [public_key for public_key, wallet in self._wallets.items() if now - wallet["last_read"] > self.idle]
+        for public_key in idle:
+            await self._unsubscribe(self._wallets.pop(public_key))
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.sweep_interval)
+            try:
+                await self.sweep()
+            except Exception as e:
+                print(f"Error releasing idle wallet subscriptions: {e}")
+
+    async def start(self, _application=None):
+        if not WALLET_WATCH:
+            return
+        # Connect now so the first reads can already be watched
+        self._get_websocket()
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self, _application=None):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        while self._wallets:
+            _, wallet = self._wallets.popitem()
+            await self._unsubscribe(wallet)
+        if self._websocket is not None:
+            self._websocket.remove_disconnect_callback(self._on_disconnect)
+            self._websocket = None
+
+
+wallet_watcher = WalletWatcher()
@@ -0,0 +1,116 @@
+import asyncio
+import hmac
+import os
+import signal
+
+from aiohttp import web
+from dotenv import load_dotenv
+from telegram import Update
+
+load_dotenv()
+
+# Public HTTPS URL Telegram delivers updates to, e.g. https://bot.example.com/telegram
+WEBHOOK_URL = os.getenv("WEBHOOK_URL")
+WEBHOOK_SECRET = os.getenv("WEBHOOK_SECRET")
+WEBHOOK_LISTEN = os.getenv("WEBHOOK_LISTEN", "0.0.0.0")
+WEBHOOK_PORT = int(os.getenv("WEBHOOK_PORT", 8443))
+WEBHOOK_PATH = os.getenv("WEBHOOK_PATH", "/telegram")
+# How many connections Telegram may open to deliver updates in parallel (1-100)
+WEBHOOK_MAX_CONNECTIONS = int(os.getenv("WEBHOOK_MAX_CONNECTIONS", 100))
+
+SECRET_HEADER = "X-Telegram-Bot-Api-Secret-Token"
+
+
+async def _handle_update(request):
+    if not hmac.compare_digest(request.headers.get(SECRET_HEADER, ""), WEBHOOK_SECRET):
+        return web.Response(status=403)
+
+    try:
+        data = await request.json()
+    except ValueError:
+        return web.Response(status=400)
+
+    # Ack right away, the update is processed in the background
+    request.app["on_update"](data)
+    return web.Response()
+
+
+async def _health(_request):
+    return web.Response(text="ok")
+
+
+def create_webhook_app(on_update):
+    """
+    Builds the aiohttp app that receives updates and passes each one, as a dict, to on_update.
+    """
+    app = web.Application()
+    app["on_update"] = on_update
+    app.router.add_post(WEBHOOK_PATH, _handle_update)
+    app.router.add_get("/healthz", _health)
+    return app
+
+
+def stop_signal(*signals):
+    """
+    Returns an event that is set on SIGINT or SIGTERM, plus any extra signals given.
+    """
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM, *signals):
+        loop.add_signal_handler(sig, stop.set)
+    return stop
+
+
+async def start_webhook(bot, on_update):
+    """
+    Starts the webhook server and registers it with Telegram. Returns the
+    aiohttp runner, clean it up to stop serving.
+    """
+    if not WEBHOOK_URL or not WEBHOOK_SECRET:
+        raise RuntimeError("WEBHOOK_URL and WEBHOOK_SECRET must be set to run in webhook mode")
+
+    runner = web.AppRunner(create_webhook_app(on_update), access_log=None)
+    await runner.setup()
+    try:
+        await web.TCPSite(runner, WEBHOOK_LISTEN, WEBHOOK_PORT).start()
+
+        # Register only once we can accept deliveries
+        await bot.set_webhook(
+            url=WEBHOOK_URL,
+            secret_token=WEBHOOK_SECRET,
+            max_connections=WEBHOOK_MAX_CONNECTIONS,
+            allowed_updates=Update.ALL_TYPES,
+        )
+    except Exception:
+        await runner.cleanup()
+        raise
+    print(f"Serving webhook on {WEBHOOK_LISTEN}:{WEBHOOK_PORT}{WEBHOOK_PATH}")
+    return runner
+
+
+async def run_webhook(application):
+    """
+    Serves application over a webhook until SIGINT or SIGTERM, running the
+    post_init/post_shutdown hooks like run_polling() does.
+    """
+    stop = stop_signal()
+
+    await application.initialize()
+    if application.post_init:
+        await application.post_init(application)
+    await application.start()
+
+    runner = None
+    try:
+        runner = await start_webhook(
+            application.bot,
+            lambda data: application.update_queue.put_nowait(Update.de_json(data, application.bot)),
+        )
+        await stop.wait()
+    finally:
+        if runner is not None:
+            await runner.cleanup()
+        await application.stop()
+        if application.post_shutdown:
+            await application.post_shutdown(application)
+        await application.shutdown()
@@ -1,19 +1,32 @@
 import base64
-import aiohttp
 import asyncio
-from solders.keypair import Keypair
-from solders.rpc.responses import SendTransactionResp, GetSignatureStatusesResp, GetBlockHeightResp
+import os
+import time
+from dotenv import load_dotenv
+from solders.rpc.responses import SendTransactionResp
 from solders.transaction import Transaction
-from solana.rpc.async_api import AsyncClient
 from solana.rpc.commitment import Confirmed, Finalized, Processed
 from solana.rpc.types import TxOpts
 from typing import Dict, Optional, Union
+from services.blockhash_service import blockhash_prefetcher
+from services.confirmation_service import EXPIRED, FAILED, confirmation_tracker, current_block_height, websocket_confirmation_tracker
+from services.http_client import get_http_client, get_rpc_client
+from services.metrics import UPSTREAM_REQUEST_SECONDS, observe
+from services.rpc_pool import rpc_pool
+from services.signer_service import Signer
+
+load_dotenv()
+
+SOL_TRACKER_SWAP_URL = os.getenv("SOL_TRACKER_SWAP_URL", "https://swap-v2.solanatracker.io")
+
+# Keeps detached rebroadcast tasks alive until they finish
+_background_tasks = set()
 
 class SolanaTracker:
-    def __init__(self, keypair: Keypair, rpc: str):
-        self.base_url = "https://swap-v2.solanatracker.io"
+    def __init__(self, signer: Signer, rpc: str):
+        self.base_url = SOL_TRACKER_SWAP_URL
         self.rpc = rpc
-        self.keypair = keypair
+        self.signer = signer
 
     async def perform_swap(
         self,
@@ -22,11 +35,12 @@ class SolanaTracker:
             "send_options": {"skip_preflight": True},
             "confirmation_retries": 30,
             "confirmation_retry_timeout": 1000,
-            "last_valid_block_height_buffer": 150,
+            "last_valid_block_height_buffer": 10,
             "commitment": "confirmed",
             "resend_interval": 1000,
             "confirmation_check_interval": 1000,
             "skip_confirmation_check": False,
+            "confirmation_mode": "polling",
         }
     ) -> Union[str, Exception]:
         commitment = options.get("commitment", "confirmed") 
@@ -40,16 +54,15 @@ class SolanaTracker:
         else:
             commitment = Confirmed
 
-        self.connection = AsyncClient(self.rpc, commitment=commitment)
+        self.connection = get_rpc_client(self.rpc, commitment)
 
         try:
             serialized_transaction = base64.b64decode(swap_response["txn"])
             txn = Transaction.from_bytes(serialized_transaction)
             
-            blockhash_resp = await self.connection.get_latest_blockhash()
-            blockhash = blockhash_resp.value
+            blockhash = await blockhash_prefetcher.get()
             
-            txn.sign([self.keypair], blockhash.blockhash)
+            self.signer.sign_transaction(txn, blockhash.blockhash)
             
             blockhash_with_expiry = {
                 "blockhash": blockhash.blockhash,
@@ -87,9 +100,9 @@ class SolanaTracker:
         url = f"{self.base_url}/swap"
 
         try:
-            async with aiohttp.ClientSession() as session:
-                async with session.get(url, params=params) as response:
-                    data = await response.json()
+            with observe(UPSTREAM_REQUEST_SECONDS, upstream="swap_quote"):
+                response = await get_http_client(url).get(url, params=params)
+                data = response.json()
             data["forceLegacy"] = force_legacy
             return data
         except Exception as error:
@@ -103,17 +116,16 @@ class SolanaTracker:
         options: Dict
     ) -> Union[str, Exception]:
         send_options = options.get("send_options", {"skip_preflight": True})
-        confirmation_retries = options.get("confirmation_retries", 30)
-        confirmation_retry_timeout = options.get("confirmation_retry_timeout", 1000)
-        last_valid_block_height_buffer = options.get("last_valid_block_height_buffer", 150)
+        last_valid_block_height_buffer = options.get("last_valid_block_height_buffer", 10)
         commitment = options.get("commitment", "processed")
         resend_interval = options.get("resend_interval", 1000)
-        confirmation_check_interval = options.get("confirmation_check_interval", 1000)
         skip_confirmation_check = options.get("skip_confirmation_check", False)
+        confirmation_mode = options.get("confirmation_mode", "polling")
 
-        last_valid_block_height = blockhash_with_expiry["last_valid_block_height"] - last_valid_block_height_buffer
-
-        retry_count = 0
+        # The transaction can land up to this height, so it only expires after it.
+        # The buffer only stops rebroadcasts that many blocks earlier.
+        last_valid_block_height = blockhash_with_expiry["last_valid_block_height"]
+        last_resend_block_height = last_valid_block_height - last_valid_block_height_buffer
 
         tx_opts = TxOpts(
             skip_preflight=send_options.get("skip_preflight", True),
@@ -121,43 +133,106 @@ class SolanaTracker:
             max_retries=send_options.get("max_retries", None)
         )
 
-        response: SendTransactionResp = await self.connection.send_raw_transaction(
-                    serialized_transaction,
-                    tx_opts
-        )
-        signature = response.value
+        # Fan the same signed bytes out to every healthy send endpoint
+        endpoints = list(dict.fromkeys([self.rpc, *options.get("send_endpoints", rpc_pool.ranked("send"))]))
+        try:
+            accepted_by, signature = await self._broadcast(endpoints, serialized_transaction, tx_opts)
+        except Exception as error:
+            return Exception(str(error))
+        self.send_report = {
+            "signature": str(signature),
+            # Where the first send was accepted, not necessarily where it landed
+            "accepted_by": accepted_by,
+            "rebroadcasts": 0,
+            "last_valid_block_height": last_valid_block_height,
+        }
+
+        # Confirmation is pushed over the shared websocket, or batched with every
+        # other in-flight signature by the polling tracker
+        tracker = websocket_confirmation_tracker if confirmation_mode == "websocket" else confirmation_tracker
+        self.confirmation = tracker.track(signature, last_valid_block_height, self.get_commitment(commitment))
+
+        # Keep rebroadcasting until the transaction lands or its blockhash expires
+        rebroadcast = asyncio.create_task(self._rebroadcast(
+            endpoints, serialized_transaction, tx_opts, self.confirmation, resend_interval, last_resend_block_height,
+        ))
+        _background_tasks.add(rebroadcast)
+        rebroadcast.add_done_callback(_background_tasks.discard)
 
         if skip_confirmation_check:
             return str(signature)
-        
-        
-        while retry_count <= confirmation_retries:
-            try:
-                status_response: GetSignatureStatusesResp = await self.connection.get_signature_statuses([signature])
-                if status_response.value[0] is not None:
-                    status = status_response.value[0]
 
-                    if self.commitment_str_to_level(str(status.confirmation_status)) >= self.commitment_to_level(str(commitment)):
-                        return str(signature)
-                    if status.err:
-                        return status.err
+        outcome, err = await asyncio.shield(self.confirmation)
+        if outcome == FAILED:
+            return err
+        if outcome == EXPIRED:
+            return Exception("Transaction expired")
+        return str(signature)
 
-                await asyncio.sleep(confirmation_check_interval / 1000)
-
-            except Exception as error:
-                print("Error checking transaction status:", error)
-                if retry_count == confirmation_retries or "Transaction expired" in str(error):
-                    return Exception(str(error))
+    async def _broadcast(self, endpoints, serialized_transaction: bytes, tx_opts: TxOpts):
+        """
+        Sends the signed transaction to every endpoint in parallel.
+        Returns (endpoint, signature) for the first endpoint to accept it; the
+        other sends keep going in the background.
+        """
+        async def send(url):
+            started = time.perf_counter()
+            try:
+                response: SendTransactionResp = await get_rpc_client(url).send_raw_transaction(
+                    serialized_transaction,
+                    tx_opts
+                )
+            except Exception:
+                rpc_pool.record(url, (time.perf_counter() - started) * 1000, False, "send")
+                raise
+            rpc_pool.record(url, (time.perf_counter() - started) * 1000, True, "send")
+            return url, response.value
 
-                retry_count += 1
+        tasks = [asyncio.ensure_future(send(url)) for url in endpoints]
+        for task in tasks:
+            task.add_done_callback(self._log_send_error)
 
-                await asyncio.sleep(confirmation_retry_timeout / 1000)
+        last_error = None
+        for next_done in asyncio.as_completed(tasks):
+            try:
+                return await next_done
+            except Exception as error:
+                last_error = error
+        raise last_error
 
-                block_height_response: GetBlockHeightResp = await self.connection.get_block_height()
-                if block_height_response.value > last_valid_block_height:
-                    return Exception("Transaction expired")
+    @staticmethod
+    def _log_send_error(task):
+        if not task.cancelled() and task.exception() is not None:
+            print("Error sending transaction:", task.exception())
 
-        return Exception("Transaction failed after maximum retries")
+    async def _rebroadcast(
+        self,
+        endpoints,
+        serialized_transaction: bytes,
+        tx_opts: TxOpts,
+        confirmation: asyncio.Future,
+        resend_interval: int,
+        last_resend_block_height: int,
+    ):
+        """
+        Resends the transaction every resend_interval ms until the confirmation
+        tracker resolves it as landed, failed or expired, or the block height
+        passes last_resend_block_height.
+        """
+        while True:
+            await asyncio.sleep(resend_interval / 1000)
+            if confirmation.done():
+                return
+            try:
+                if await current_block_height() > last_resend_block_height:
+                    return
+            except Exception as error:
+                print("Error checking block height:", error)
+            try:
+                await self._broadcast(endpoints, serialized_transaction, tx_opts)
+                self.send_report["rebroadcasts"] += 1
+            except Exception as error:
+                print("Error rebroadcasting transaction:", error)
     
     @staticmethod
     def commitment_to_level(commitment: str):
@@ -0,0 +1,59 @@
+import os
+import socket
+
+import pytest
+import pytest_asyncio
+
+from benchmarks.fakes import FakeTelegramRequest, FakeUpstreams
+
+# Keeps background services local and off disk
+TEST_ENV = {
+    "PUBSUB_BACKEND": "memory",
+    "SWAP_CONFIRMATION_MODE": "polling",
+    "WALLET_WATCH": "false",
+    "FILE_ID_CACHE_PATH": "",
+    "METRICS_PORT": "",
+}
+
+
+def _free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+# Services read their configuration at import time, and every test's fakes
+# listen on the same port, so point the services at them before anything imports one
+FAKES_PORT = _free_port()
+os.environ.update(FakeUpstreams(port=FAKES_PORT).env())
+os.environ.update(TEST_ENV)
+
+
+@pytest_asyncio.fixture
+async def fakes():
+    fakes = FakeUpstreams(port=FAKES_PORT)
+    await fakes.start()
+    yield fakes
+    await fakes.stop()
+
+
+@pytest.fixture
+def telegram_request():
+    return FakeTelegramRequest()
+
+
+@pytest_asyncio.fixture
+async def application(fakes, telegram_request):
+    """
+    The Application built in main.py, running against the fakes.
+    """
+    from main import build_application, post_init, post_shutdown
+
+    application = build_application("1:test", telegram_request, FakeTelegramRequest())
+    await application.initialize()
+    await post_init(application)
+    await application.start()
+    yield application
+    await application.stop()
+    await post_shutdown(application)
+    await application.shutdown()
@@ -0,0 +1,57 @@
+import asyncio
+
+import pytest
+import pytest_asyncio
+from solders.signature import Signature
+
+from services.confirmation_service import LANDED, ConfirmationTracker, WebsocketConfirmationTracker
+from services.http_client import close_clients
+from services.rpc_websocket import close_websockets
+from tests.test_rpc_websocket import wait_until
+
+# Far above the fake block height, so nothing expires during a test
+LAST_VALID_BLOCK_HEIGHT = 10 ** 9
+
+
+@pytest_asyncio.fixture
+async def tracker(fakes):
+    polling = ConfirmationTracker(interval=0.05)
+    yield WebsocketConfirmationTracker(fakes.ws_url, polling, connect_timeout=0.5)
+    await polling.stop()
+    await close_websockets()
+    await close_clients()
+
+
+@pytest.mark.asyncio
+async def test_landed_signature_is_pushed_over_the_websocket(fakes, tracker):
+    signature = Signature.new_unique()
+    fakes.land(signature)
+
+    assert await asyncio.wait_for(tracker.track(signature, LAST_VALID_BLOCK_HEIGHT), 5) == (LANDED, None)
+    assert fakes.rpc_calls["signatureSubscribe"] == 1
+    assert fakes.rpc_calls["getSignatureStatuses"] == 0
+
+
+@pytest.mark.asyncio
+async def test_polls_when_the_websocket_cant_connect(fakes, tracker):
+    fakes.websocket_enabled = False
+    signature = Signature.new_unique()
+    fakes.land(signature)
+
+    assert await asyncio.wait_for(tracker.track(signature, LAST_VALID_BLOCK_HEIGHT), 5) == (LANDED, None)
+    assert fakes.rpc_calls["signatureSubscribe"] == 0
+    assert fakes.rpc_calls["getSignatureStatuses"] > 0
+
+
+@pytest.mark.asyncio
+async def test_polls_when_the_websocket_drops_while_waiting(fakes, tracker):
+    signature = Signature.new_unique()
+    result = tracker.track(signature, LAST_VALID_BLOCK_HEIGHT)
+    await wait_until(lambda: fakes.ws_subscriptions)
+
+    await fakes.drop_websockets()
+    await wait_until(lambda: len(tracker.fallback))
+    fakes.land(signature)
+
+    assert await asyncio.wait_for(result, 5) == (LANDED, None)
+    assert fakes.rpc_calls["getSignatureStatuses"] > 0
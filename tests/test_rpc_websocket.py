@@ -0,0 +1,105 @@
+import asyncio
+import time
+
+import pytest
+import pytest_asyncio
+from solders.pubkey import Pubkey
+from solders.signature import Signature
+
+from services.rpc_websocket import RpcWebsocket
+
+
+async def wait_until(condition, timeout=5):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "timed out"
+        await asyncio.sleep(0.01)
+
+
+@pytest_asyncio.fixture
+async def websocket(fakes):
+    websocket = RpcWebsocket(fakes.ws_url)
+    websocket.start()
+    await websocket.wait_connected(5)
+    yield websocket
+    await websocket.close()
+
+
+def account_params():
+    return [str(Pubkey.new_unique()), {"encoding": "base64", "commitment": "confirmed"}]
+
+
+@pytest.mark.asyncio
+async def test_identical_subscriptions_open_once_and_close_with_the_last(fakes, websocket):
+    params = account_params()
+    first, second = [], []
+
+    key = await websocket.subscribe("accountSubscribe", params, first.append)
+    assert await websocket.subscribe("accountSubscribe", params, second.append) == key
+    assert fakes.rpc_calls["accountSubscribe"] == 1
+    assert len(fakes.ws_subscriptions) == 1
+
+    await websocket.unsubscribe(key, first.append)
+    assert fakes.rpc_calls["accountUnsubscribe"] == 0
+    assert len(fakes.ws_subscriptions) == 1
+
+    await websocket.unsubscribe(key, second.append)
+    assert fakes.rpc_calls["accountUnsubscribe"] == 1
+    assert fakes.ws_subscriptions == {}
+
+
+@pytest.mark.asyncio
+async def test_signature_notification_reaches_every_subscriber(fakes, websocket):
+    signature = str(Signature.new_unique())
+    params = [signature, {"commitment": "confirmed"}]
+    first, second = [], []
+
+    await websocket.subscribe("signatureSubscribe", params, first.append)
+    await websocket.subscribe("signatureSubscribe", params, second.append)
+    fakes.land(signature)
+    await wait_until(lambda: first and second)
+
+    assert fakes.rpc_calls["signatureSubscribe"] == 1
+    assert first == second
+    assert first[0]["value"] == {"err": None}
+    assert fakes.ws_subscriptions == {}
+
+
+@pytest.mark.asyncio
+async def test_reconnects_and_resubscribes_after_a_drop(fakes, websocket):
+    accounts = []
+    account_key = await websocket.subscribe("accountSubscribe", account_params(), accounts.append)
+    signature = str(Signature.new_unique())
+    notifications = []
+    await websocket.subscribe("signatureSubscribe", [signature, {"commitment": "confirmed"}], notifications.append)
+    disconnects = []
+    websocket.add_disconnect_callback(lambda: disconnects.append(True))
+
+    await fakes.drop_websockets()
+    await wait_until(lambda: fakes.rpc_calls["signatureSubscribe"] == 2 and fakes.rpc_calls["accountSubscribe"] == 2)
+
+    assert disconnects == [True]
+    assert websocket.connected
+    assert len(fakes.ws_subscriptions) == 2
+
+    # Notifications arrive under the new subscription ids
+    fakes.land(signature)
+    await wait_until(lambda: notifications)
+    assert notifications[0]["value"] == {"err": None}
+
+    await websocket.unsubscribe(account_key, accounts.append)
+    assert fakes.ws_subscriptions == {}
+
+
+@pytest.mark.asyncio
+async def test_concurrent_identical_subscriptions_share_one_request(fakes, websocket):
+    params = account_params()
+    first, second = [], []
+
+    keys = await asyncio.gather(
+        websocket.subscribe("accountSubscribe", params, first.append),
+        websocket.subscribe("accountSubscribe", params, second.append),
+    )
+
+    assert keys[0] == keys[1]
+    assert fakes.rpc_calls["accountSubscribe"] == 1
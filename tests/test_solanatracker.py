@@ -0,0 +1,76 @@
+import asyncio
+
+import pytest
+import pytest_asyncio
+from solders.keypair import Keypair
+from solders.message import Message
+from solders.system_program import TransferParams, transfer
+from solders.transaction import Transaction
+
+from services.confirmation_service import CONFIRMATION_POLL_INTERVAL, LANDED, confirmation_tracker
+from services.http_client import close_clients, get_rpc_client
+from solanatracker import SolanaTracker, _background_tasks
+
+
+@pytest_asyncio.fixture
+async def rpc_url(fakes):
+    yield f"{fakes.base_url}/rpc"
+    for task in list(_background_tasks):
+        task.cancel()
+    await confirmation_tracker.stop()
+    await close_clients()
+
+
+async def signed_transfer(rpc_url):
+    """
+    A signed 0 lamport self-transfer and the blockhash it was signed with.
+    """
+    blockhash = (await get_rpc_client(rpc_url).get_latest_blockhash()).value
+    payer = Keypair()
+    message = Message.new_with_blockhash(
+        [transfer(TransferParams(from_pubkey=payer.pubkey(), to_pubkey=payer.pubkey(), lamports=0))],
+        payer.pubkey(), blockhash.blockhash,
+    )
+    return Transaction([payer], message, blockhash.blockhash), {
+        "blockhash": blockhash.blockhash,
+        "last_valid_block_height": blockhash.last_valid_block_height,
+    }
+
+
+async def send(rpc_url, resend_interval):
+    txn, blockhash_with_expiry = await signed_transfer(rpc_url)
+    tracker = SolanaTracker(None, rpc_url)
+    result = await asyncio.wait_for(tracker.transaction_sender_and_confirmation_waiter(
+        serialized_transaction=bytes(txn),
+        blockhash_with_expiry=blockhash_with_expiry,
+        options={"commitment": "confirmed", "resend_interval": resend_interval, "send_endpoints": []},
+    ), 10)
+    return txn, blockhash_with_expiry, tracker, result
+
+
+@pytest.mark.asyncio
+async def test_trade_landing_after_several_polls_is_confirmed(fakes, rpc_url):
+    fakes.land_delay_ms = CONFIRMATION_POLL_INTERVAL * 2500
+
+    txn, blockhash_with_expiry, tracker, result = await send(rpc_url, resend_interval=60_000)
+
+    assert result == str(txn.signatures[0])
+    assert tracker.confirmation.result() == (LANDED, None)
+    assert tracker.send_report["last_valid_block_height"] == blockhash_with_expiry["last_valid_block_height"]
+
+
+@pytest.mark.asyncio
+async def test_trade_is_rebroadcast_until_it_lands(fakes, rpc_url):
+    fakes.land_delay_ms = 2000
+
+    txn, _, tracker, result = await send(rpc_url, resend_interval=200)
+
+    assert result == str(txn.signatures[0])
+    assert tracker.send_report["accepted_by"] == rpc_url
+    # Every resend_interval until the fake reported it landed, and none after
+    await asyncio.sleep(0.5)
+    sends = fakes.rpc_calls["sendTransaction"]
+    assert tracker.send_report["rebroadcasts"] >= 5
+    assert sends == tracker.send_report["rebroadcasts"] + 1
+    await asyncio.sleep(0.5)
+    assert fakes.rpc_calls["sendTransaction"] == sends
@@ -0,0 +1,51 @@
+import json
+
+import pytest
+import pytest_asyncio
+
+from services import state_store, supabase_client
+from services.state_store import STATE_TABLE, SupabaseKVStore, UserDataPersistence
+from tests.test_rpc_websocket import wait_until
+
+USER_DATA = {"action": "buy", "amount": 0.5, "coin": "Bench"}
+
+
+@pytest_asyncio.fixture
+async def store(fakes):
+    # The shared client is bound to the event loop of the test that created it
+    supabase_client._supabase = None
+    yield SupabaseKVStore()
+    supabase_client._supabase = None
+
+
+def stored(fakes, user_id):
+    row = fakes.tables.get(STATE_TABLE, {}).get(f"user:{user_id}")
+    return None if row is None else json.loads(row["value"])
+
+
+@pytest.mark.asyncio
+async def test_user_data_survives_a_restart(fakes, store):
+    persistence = UserDataPersistence(store)
+    await persistence.update_user_data(1, USER_DATA)
+    await persistence.flush()
+    assert stored(fakes, 1) == USER_DATA
+
+    restarted = UserDataPersistence(store)
+    user_data = {}
+    await restarted.refresh_user_data(1, user_data)
+    assert user_data == USER_DATA
+
+
+@pytest.mark.asyncio
+async def test_failed_batch_is_retried(fakes, store, monkeypatch):
+    monkeypatch.setattr(state_store, "RETRY_DELAY", 0.1)
+    fakes.profiles["supabase"].error_rate = 1.0
+
+    persistence = UserDataPersistence(store)
+    await persistence.update_user_data(1, USER_DATA)
+    await wait_until(lambda: fakes.errors["supabase"] >= 2)
+    assert stored(fakes, 1) is None
+
+    fakes.profiles["supabase"].error_rate = 0.0
+    await wait_until(lambda: stored(fakes, 1) == USER_DATA)
+    await persistence.flush()
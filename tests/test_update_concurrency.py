@@ -0,0 +1,28 @@
+import asyncio
+
+import pytest
+
+from benchmarks.load import LoadRunner
+from benchmarks.updates import random_mint
+
+SLOW_MS = 2000
+
+
+@pytest.mark.asyncio
+async def test_slow_upstream_for_one_user_does_not_delay_another(fakes, telegram_request, application):
+    runner = LoadRunner(application, update_timeout=10)
+    slow_mint, fast_mint = random_mint(), random_mint()
+    fakes.mint_delays[slow_mint] = SLOW_MS
+    fakes.seed_users([1, 2])
+
+    slow = asyncio.ensure_future(runner.send(runner.updates.message(1, slow_mint)))
+    # User 1's lookup is already waiting on the slow upstream when user 2 pastes
+    await asyncio.sleep(0.1)
+    fast_ms = await runner.send(runner.updates.message(2, fast_mint))
+
+    assert not slow.done()
+    assert fast_ms < SLOW_MS / 4
+    assert await slow >= SLOW_MS
+    assert runner.errors == 0
+    assert runner.timeouts == 0
+    assert telegram_request.error_replies == 0